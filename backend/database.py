@@ -1,33 +1,189 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.server_api import ServerApi
+from pymongo.read_preferences import SecondaryPreferred
+from pymongo import monitoring
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Imported after load_dotenv so their settings see .env values
+from utils.search import ensure_text_index
+from utils.geo import PROJECT_GEO_INDEX
+from utils.retention import MESSAGE_ARCHIVE_TTL_DAYS
+
 # MongoDB connection
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "skillsync")
+ACTIVITY_EVENT_TTL_DAYS = int(os.getenv("ACTIVITY_EVENT_TTL_DAYS", "30"))
+
+# Replica reads: listing/browse/stats endpoints read through read_db
+REPLICA_READS = os.getenv("REPLICA_READS", "true").lower() == "true"
+# Seconds a secondary may lag before it is skipped (Mongo minimum is 90; -1 disables)
+REPLICA_MAX_STALENESS_SECONDS = int(os.getenv("REPLICA_MAX_STALENESS_SECONDS", "90"))
+# After a causal write, the caller's reads wait for a replica to catch up to
+# it for this long (the read_after cookie's lifetime, utils/read_your_writes.py)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Circuit breaker: trips when too many recent commands fail or run slow
+DB_BREAKER_WINDOW = int(os.getenv("DB_BREAKER_WINDOW", "50"))
+DB_BREAKER_MIN_CALLS = int(os.getenv("DB_BREAKER_MIN_CALLS", "20"))
+DB_BREAKER_FAILURE_RATE = float(os.getenv("DB_BREAKER_FAILURE_RATE", "0.5"))
+DB_BREAKER_SLOW_MS = float(os.getenv("DB_BREAKER_SLOW_MS", "1000"))
+DB_BREAKER_OPEN_SECONDS = float(os.getenv("DB_BREAKER_OPEN_SECONDS", "10"))
+DB_BREAKER_PROBES = int(os.getenv("DB_BREAKER_PROBES", "3"))
+
+# Server error codes that mean the database (not the request) is in trouble
+TRANSIENT_ERROR_CODES = {6, 7, 50, 89, 91, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436}
+
+
+class DatabaseUnavailable(Exception):
+    """Raised instead of querying while the circuit breaker is open (503, see main.py)"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Database temporarily unavailable")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker(monitoring.CommandListener):
+    """
+    Watches every command the driver sends. Once at least min_calls of the
+    last `window` outcomes are in and `failure_rate` of them failed or ran
+    slower than slow_ms, the breaker opens: allow() refuses requests for
+    open_seconds. It then half-opens and lets `probes` requests through -
+    all of their commands must succeed to close it, any bad one re-opens it.
+
+    Listener callbacks run on the driver's executor threads, hence the lock.
+    """
+
+    def __init__(self, window: int = DB_BREAKER_WINDOW, min_calls: int = DB_BREAKER_MIN_CALLS,
+                 failure_rate: float = DB_BREAKER_FAILURE_RATE, slow_ms: float = DB_BREAKER_SLOW_MS,
+                 open_seconds: float = DB_BREAKER_OPEN_SECONDS, probes: int = DB_BREAKER_PROBES):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_micros = slow_ms * 1000
+        self.open_seconds = open_seconds
+        self.probes = probes
+        self.state = "closed"
+        self.trips = 0
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes_left = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True if a request may use the database now"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    return False
+                self.state = "half_open"
+                self._probes_left = self.probes
+                self._probe_successes = 0
+                print("🔌 Database circuit half-open, probing")
+            if self._probes_left > 0:
+                self._probes_left -= 1
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        return max(1.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def record(self, bad: bool):
+        with self._lock:
+            if self.state == "half_open":
+                if bad:
+                    self._open()
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.probes:
+                        self.state = "closed"
+                        self._outcomes.clear()
+                        print("🔌 Database circuit closed")
+                return
+            if self.state == "open":
+                return
+            self._outcomes.append(bad)
+            if len(self._outcomes) >= self.min_calls and sum(self._outcomes) >= self.failure_rate * len(self._outcomes):
+                self._open()
+
+    def _open(self):
+        self.state = "open"
+        self.trips += 1
+        self._opened_at = time.monotonic()
+        print(f"🔌 Database circuit open for {self.open_seconds}s")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "trips": self.trips, "recent_bad": sum(self._outcomes), "recent_calls": len(self._outcomes)}
+
+    # monitoring.CommandListener
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        # getMore may legitimately wait (tailable/awaitData cursors), so only its success counts
+        slow = event.command_name != "getMore" and event.duration_micros > self.slow_micros
+        self.record(slow)
+
+    def failed(self, event):
+        # Network errors carry no code; ordinary command errors (e.g. duplicate key) don't count
+        code = event.failure.get("code") if isinstance(event.failure, dict) else None
+        self.record(code is None or code in TRANSIENT_ERROR_CODES)
+
+
+breaker = CircuitBreaker()
 
 client: AsyncIOMotorClient = None
 database = None
 db = None  # Alias for backward compatibility
+read_db = None  # secondaryPreferred handle (same as db when REPLICA_READS is off)
+
+# Background loops (rollups, archiver, jobs, flushes) use their own client
+# without the breaker: their long or failing commands say nothing about
+# whether API requests can be served, and must not trip the circuit for them
+background_client: AsyncIOMotorClient = None
+background_db = None
+
+# Per request: {"after": operationTime the caller's reads must follow,
+# "wrote": latest operationTime of this request's causal writes}
+causal_times: ContextVar[Optional[dict]] = ContextVar("causal_times", default=None)
 
 
 async def connect_to_mongo():
     """Connect to MongoDB on startup"""
-    global client, database, db
+    global client, database, db, read_db, background_client, background_db
     try:
         client = AsyncIOMotorClient(
             MONGO_URI,
             server_api=ServerApi('1'),
             maxPoolSize=10,
-            minPoolSize=1
+            minPoolSize=1,
+            event_listeners=[breaker]
         )
         # Test connection
         await client.admin.command('ping')
         database = client[DATABASE_NAME]
         db = database  # Create alias
+        read_db = database.with_options(
+            read_preference=SecondaryPreferred(max_staleness=REPLICA_MAX_STALENESS_SECONDS)
+        ) if REPLICA_READS else database
+        background_client = AsyncIOMotorClient(
+            MONGO_URI,
+            server_api=ServerApi('1'),
+            maxPoolSize=5,
+            minPoolSize=0
+        )
+        background_db = background_client[DATABASE_NAME]
         print(f"✅ Connected to MongoDB: {DATABASE_NAME}")
         print(f"✅ Database object created: {db is not None}")
     except Exception as e:
@@ -38,14 +194,154 @@ async def connect_to_mongo():
 async def close_mongo_connection():
     """Close MongoDB connection on shutdown"""
     global client
+    if background_client:
+        background_client.close()
     if client:
         client.close()
         print("MongoDB connection closed")
 
 
+def ensure_available():
+    """Fail fast with DatabaseUnavailable while the circuit breaker is open"""
+    if not breaker.allow():
+        raise DatabaseUnavailable(breaker.retry_after())
+
+
+@asynccontextmanager
+async def causal_write():
+    """
+    Causal session for writes the caller's next reads must see. Its
+    operationTime goes back to the caller, so later reads - on any worker -
+    can wait for a replica to apply the write instead of using the primary.
+    """
+    async with await client.start_session(causal_consistency=True) as session:
+        yield session
+        times = causal_times.get()
+        wrote = session.operation_time
+        if times is not None and wrote is not None and (times["wrote"] is None or wrote > times["wrote"]):
+            times["wrote"] = wrote
+
+
+@asynccontextmanager
+async def causal_read():
+    """
+    Session for read_db reads that must see the caller's recent causal
+    writes: it starts at their operationTime, so the replica answers only
+    once it has applied them (afterClusterTime). None when there is nothing
+    to wait for.
+    """
+    times = causal_times.get() or {}
+    after = max(filter(None, [times.get("after"), times.get("wrote")]), default=None)
+    if after is None:
+        yield None
+        return
+    async with await client.start_session(causal_consistency=True) as session:
+        session.advance_operation_time(after)
+        yield session
+
+
 def get_db():
     """Get database instance synchronously"""
     global db
     if db is None:
         raise RuntimeError("Database not initialized. Call connect_to_mongo first.")
-    return db
\ No newline at end of file
+    return db
+
+def get_background_db():
+    """Database instance for background loops (not watched by the circuit breaker)"""
+    if background_db is None:
+        raise RuntimeError("Database not initialized. Call connect_to_mongo first.")
+    return background_db
+
+# Covers get_project's revalidation query: equality on _id and clientId, returns updatedAt
+PROJECT_REVALIDATION_INDEX = [("_id", 1), ("clientId", 1), ("updatedAt", 1)]
+
+async def ensure_indexes():
+    """Create the indexes the routers rely on (idempotent)"""
+    # Login lookups and admin user listing (email-prefix pages walk this index)
+    await db.users.create_index("email")
+    await db.users.create_index([("role", 1), ("_id", -1)])
+    await db.users.create_index([("role", 1), ("status", 1), ("_id", -1)])
+    await db.users.create_index([("status", 1), ("_id", -1)])
+    # Analytics rollup windows
+    await db.users.create_index("createdAt")
+    await db.projects.create_index("createdAt")
+    await db.earnings_ledger.create_index([("type", 1), ("createdAt", 1)])
+    # Earnings ledger: one entry per proposal and event type
+    await db.earnings_ledger.create_index(
+        [("proposalId", 1), ("type", 1)], unique=True
+    )
+    await db.earnings_ledger.create_index([("contractorId", 1), ("_id", 1)])
+    # Earnings rollups: one document per contractor and period
+    await db.earnings_rollups.create_index(
+        [("contractorId", 1), ("period", -1)], unique=True
+    )
+    # Contractor dashboard counts and recent proposals
+    await db.proposals.create_index([("contractorId", 1), ("status", 1)])
+    await db.proposals.create_index([("contractorId", 1), ("updatedAt", -1)])
+    # Contractor assignment checks
+    await db.proposals.create_index([("projectId", 1), ("contractorId", 1), ("status", 1)])
+    # Proposals for a project, newest first
+    await db.proposals.create_index([("projectId", 1), ("submittedDate", -1)])
+    # Admin project browser filters (paged by _id)
+    await db.projects.create_index([("status", 1), ("_id", -1)])
+    await db.projects.create_index([("budget", 1), ("_id", -1)])
+    # Contractor project search
+    await ensure_text_index(db)
+    # Nearby project discovery ($geoNear)
+    await db.projects.create_index(PROJECT_GEO_INDEX)
+    # Contractor browse sorts by rating; one review per project
+    await db.users.create_index([("role", 1), ("rating", -1)])
+    await db.reviews.create_index("projectId", unique=True)
+    # Cascading deletes by owner
+    await db.messages.create_index("senderId")
+    await db.messages.create_index("recipientId")
+    # Client listing ETags: covered newest-updatedAt + count
+    await db.projects.create_index([("clientId", 1), ("updatedAt", -1)])
+    await db.projects.create_index([("clientId", 1), ("status", 1), ("updatedAt", -1)])
+    await db.proposals.create_index([("projectId", 1), ("updatedAt", -1)])
+    # Single-project ETags: covered ownership check + updatedAt (hinted, the
+    # planner would otherwise take _id_ and fetch the document)
+    await db.projects.create_index(PROJECT_REVALIDATION_INDEX)
+    # Unread badges: only unread messages are indexed
+    await db.messages.create_index(
+        [("recipientId", 1), ("senderId", 1)],
+        name="unread_by_recipient",
+        partialFilterExpression={"read": False}
+    )
+    # Retention: hot messages by age, archive by participant. Each direction of
+    # the archive listing's $or has a (participant, _id) index, so the branches
+    # merge in _id order without an in-memory sort; the same prefixes serve
+    # the delete_user cascade
+    await db.messages.create_index("createdAt")
+    await db.messages_archive.create_index([("senderId", 1), ("recipientId", 1), ("_id", -1)])
+    await db.messages_archive.create_index([("senderId", 1), ("_id", -1)])
+    await db.messages_archive.create_index([("recipientId", 1), ("_id", -1)])
+    if MESSAGE_ARCHIVE_TTL_DAYS > 0:
+        await db.messages_archive.create_index(
+            "createdAt", expireAfterSeconds=MESSAGE_ARCHIVE_TTL_DAYS * 86400
+        )
+    # Conversation buckets: open-bucket appends and newest-first reads
+    # One open bucket per pair and origin; also serves the open-bucket append
+    await db.message_buckets.create_index(
+        [("pair", 1), ("origin", 1)],
+        name="one_open_bucket",
+        unique=True,
+        partialFilterExpression={"open": True}
+    )
+    await db.message_buckets.create_index("participants")
+    await db.message_buckets.create_index([("pair", 1), ("maxId", -1)])
+    await db.message_buckets.create_index([("open", 1), ("maxId", 1)])
+    # Shared rate-limit buckets expire once idle
+    await db.rate_limits.create_index("expiresAt", expireAfterSeconds=0)
+    # Job queue claims
+    await db.jobs.create_index([("status", 1), ("createdAt", 1)])
+    # Disputes queue: equality, sort, then the availableAt range
+    await db.disputes.create_index([("status", 1), ("priority", -1), ("createdAt", 1), ("availableAt", 1)])
+    await db.disputes.create_index([("status", 1), ("createdAt", 1), ("availableAt", 1)])
+    # Channel events merged into feeds at read time; expire after ACTIVITY_EVENT_TTL_DAYS
+    await db.activity_events.create_index([("channels", 1), ("createdAt", -1)])
+    await db.activity_events.create_index(
+        "createdAt", expireAfterSeconds=ACTIVITY_EVENT_TTL_DAYS * 86400
+    )
+    print("✅ Indexes ensured")
@@ -3,11 +3,19 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.responses import JSONResponse
-from database import connect_to_mongo, close_mongo_connection
+from database import connect_to_mongo, close_mongo_connection, ensure_indexes, get_background_db, DatabaseUnavailable
 from routers.auth import router as auth_router
 from routers.admin import router as admin_router
 from routers.client import router as client_router
 from routers.contractor import router as contractor_router
+from utils.progress_buffer import progress_buffer
+from utils.rate_limit import RateLimitMiddleware, rate_limit_store
+from utils.read_your_writes import ReadYourWritesMiddleware
+from utils.analytics import run_scheduler as run_analytics_scheduler
+from utils.jobs import run_worker as run_job_worker
+from utils.retention import run_archiver as run_message_archiver
+from utils.invalidation import run_invalidation_stream
+import asyncio
 
 app = FastAPI(
     title="SkillSync API",
@@ -17,6 +25,12 @@ app = FastAPI(
     redoc_url=None
 )
 
+# Causal write times in and out as a cookie (read-your-writes on replicas)
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Rate limiting — registered before CORS so 429s still get CORS headers
+app.add_middleware(RateLimitMiddleware, store=rate_limit_store)
+
 # ────────────────────────────────────────────────
 # CORS — this is the critical part that was blocking frontend requests
 # ────────────────────────────────────────────────
@@ -117,13 +131,42 @@ async def internal_error_handler(request: Request, exc):
         },
     )
 
+@app.exception_handler(DatabaseUnavailable)
+async def database_unavailable_handler(request: Request, exc: DatabaseUnavailable):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service temporarily unavailable. Please try again shortly."},
+        headers={
+            "Retry-After": str(round(exc.retry_after)),
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Credentials": "true",
+            "Access-Control-Allow-Methods": "*",
+            "Access-Control-Allow-Headers": "*",
+        },
+    )
+
+# Long-running jobs started on startup, cancelled on shutdown
+background_tasks = []
+
 # MongoDB connection events
 @app.on_event("startup")
 async def startup_event():
     await connect_to_mongo()
+    await ensure_indexes()
+    # Background work runs on its own client, outside the request circuit breaker
+    progress_buffer.start(get_background_db)
+    background_tasks.append(asyncio.create_task(run_analytics_scheduler(get_background_db)))
+    background_tasks.append(asyncio.create_task(run_job_worker(get_background_db)))
+    background_tasks.append(asyncio.create_task(run_message_archiver(get_background_db)))
+    background_tasks.append(asyncio.create_task(run_invalidation_stream(get_background_db)))
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    # Wait for them to unwind so nothing is still using the client when it closes
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await progress_buffer.stop(get_background_db())
     await close_mongo_connection()
 
 # Basic endpoints
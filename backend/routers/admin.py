@@ -1,8 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from utils.auth import get_current_user, require_role
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from bson import ObjectId
+from datetime import datetime
+import csv
+import io
+import re
+from utils.analytics import latest_snapshot
+from utils.auth import account_status_cache, get_current_user, require_role
+from utils.bson_compat import id_match, id_str
+from utils.deadlines import DeadlineRoute, deadline, deadline_exceeded, QUERY_DEADLINE_SECONDS
+from utils.disputes import claim_next, release, resolve, dispute_summary
+from utils.jobs import enqueue, job_summary, requeue
+import database
 
-router = APIRouter(prefix="/admin", tags=["Admin"])
+router = APIRouter(prefix="/admin", tags=["Admin"], route_class=DeadlineRoute)
+
+# Fields admins may see - never credentials
+USER_PROJECTION = {"name": 1, "email": 1, "role": 1, "status": 1, "createdAt": 1}
+# Exact totals stop counting past this point
+EXACT_COUNT_CAP = 10000
 
 # Dependency to ensure only admins can access these routes
 async def require_admin(current_user: dict = Depends(get_current_user)):
@@ -13,73 +31,372 @@ async def require_admin(current_user: dict = Depends(get_current_user)):
         )
     return current_user
 
+def _user_summary(user: dict) -> dict:
+    return {
+        "id": str(user["_id"]),
+        "name": user.get("name"),
+        "email": user.get("email"),
+        "role": user.get("role"),
+        "status": user.get("status", "active"),
+        "created_at": user["createdAt"].isoformat() if user.get("createdAt") else None
+    }
+
 @router.get("/users")
-async def get_all_users(admin: dict = Depends(require_admin)):
-    """Get all users (admin only)"""
-    # TODO: Implement database query to get all users
+async def get_all_users(
+    admin: dict = Depends(require_admin),
+    role: Optional[str] = Query(None, description="client, contractor or admin"),
+    user_status: Optional[Literal["active", "suspended", "deleting"]] = Query(None, alias="status"),
+    email_prefix: Optional[str] = Query(None, min_length=1),
+    after: Optional[str] = Query(None, description="Cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    total_mode: Literal["estimated", "exact", "none"] = Query("estimated")
+):
+    """
+    Get all users (admin only).
+    Pages newest first by _id - or alphabetically by email when filtering by
+    email_prefix - and pass next_cursor back as `after`.
+    total_mode "estimated" reads collection metadata and ignores filters,
+    "exact" counts matches up to EXACT_COUNT_CAP.
+    """
+    db = database.db
+    query = {}
+    if role:
+        query["role"] = role
+    if user_status in ("suspended", "deleting"):
+        query["status"] = user_status
+    elif user_status == "active":
+        # Accounts created before statuses existed have no status field
+        query["status"] = {"$in": ["active", None]}
+    if email_prefix:
+        query["email"] = {"$regex": "^" + re.escape(email_prefix)}
+
+    page_query = dict(query)
+    if email_prefix:
+        # The prefix is a range on the email index, so page along it: sorting
+        # by _id instead would scan the whole range and sort it in memory.
+        # Registration keeps emails unique, so the last email is the cursor
+        if after:
+            page_query["email"] = {**query["email"], "$gt": after}
+        sort, cursor_field = [("email", 1)], "email"
+    else:
+        if after:
+            if not ObjectId.is_valid(after):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            page_query["_id"] = {"$lt": ObjectId(after)}
+        sort, cursor_field = [("_id", -1)], "_id"
+
+    users = await db.users.find(page_query, USER_PROJECTION).sort(sort).to_list(limit)
+
+    total = None
+    total_capped = False
+    if total_mode == "estimated":
+        total = await db.users.estimated_document_count()
+    elif total_mode == "exact":
+        total = await db.users.count_documents(query, limit=EXACT_COUNT_CAP + 1)
+        total_capped = total > EXACT_COUNT_CAP
+        total = min(total, EXACT_COUNT_CAP)
+
     return {
-        "users": [
-            {"id": "1", "name": "John Doe", "email": "john@example.com", "role": "client"},
-            {"id": "2", "name": "Jane Smith", "email": "jane@example.com", "role": "contractor"},
-        ],
-        "total": 2
+        "users": [_user_summary(u) for u in users],
+        "next_cursor": str(users[-1][cursor_field]) if len(users) == limit else None,
+        "total": total,
+        "total_mode": total_mode,
+        "total_capped": total_capped
     }
 
 @router.get("/users/{user_id}")
 async def get_user_details(user_id: str, admin: dict = Depends(require_admin)):
     """Get detailed user information"""
-    # TODO: Implement database query
-    return {
-        "id": user_id,
-        "name": "John Doe",
-        "email": "john@example.com",
-        "role": "client",
-        "created_at": "2024-01-15",
-        "total_projects": 5
-    }
+    if not ObjectId.is_valid(user_id):
+        raise HTTPException(status_code=400, detail="Invalid user ID")
+
+    db = database.db
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, USER_PROJECTION)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if user.get("role") == "contractor":
+        total_projects = await db.proposals.count_documents({"contractorId": id_match(user_id), "status": "accepted"})
+    else:
+        total_projects = await db.projects.count_documents({"clientId": id_match(user_id)})
+
+    return {**_user_summary(user), "total_projects": total_projects}
 
-@router.patch("/users/{user_id}/suspend")
+async def _find_user_or_404(db, user_id: str) -> dict:
+    if not ObjectId.is_valid(user_id):
+        raise HTTPException(status_code=400, detail="Invalid user ID")
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, {"status": 1})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+@router.patch("/users/{user_id}/suspend", status_code=status.HTTP_202_ACCEPTED)
 async def suspend_user(user_id: str, admin: dict = Depends(require_admin)):
-    """Suspend a user account"""
-    # TODO: Implement user suspension logic
-    return {"message": f"User {user_id} suspended successfully"}
+    """
+    Suspend a user account.
+    The account is blocked immediately; putting their open projects on hold
+    and withdrawing pending proposals runs as a background job.
+    """
+    db = database.db
+    await _find_user_or_404(db, user_id)
+    await db.users.update_one(
+        {"_id": ObjectId(user_id)},
+        {"$set": {"status": "suspended", "updatedAt": datetime.utcnow()}}
+    )
+    account_status_cache.invalidate(user_id)
+    job_id = await enqueue(db, "suspend_user", user_id, admin["sub"])
+    return {"message": f"User {user_id} suspended", "job_id": job_id}
 
-@router.delete("/users/{user_id}")
+@router.delete("/users/{user_id}", status_code=status.HTTP_202_ACCEPTED)
 async def delete_user(user_id: str, admin: dict = Depends(require_admin)):
-    """Delete a user account"""
-    # TODO: Implement user deletion logic
-    return {"message": f"User {user_id} deleted successfully"}
+    """
+    Delete a user account.
+    The account is blocked immediately; deleting it and its projects,
+    proposals and messages runs as a background job.
+    """
+    db = database.db
+    user = await _find_user_or_404(db, user_id)
+    if user.get("status") == "deleting":
+        raise HTTPException(status_code=409, detail="User deletion already in progress")
+    await db.users.update_one(
+        {"_id": ObjectId(user_id)},
+        {"$set": {"status": "deleting", "updatedAt": datetime.utcnow()}}
+    )
+    account_status_cache.invalidate(user_id)
+    job_id = await enqueue(db, "delete_user", user_id, admin["sub"])
+    return {"message": f"User {user_id} scheduled for deletion", "job_id": job_id}
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, admin: dict = Depends(require_admin)):
+    """Get progress of a suspension or deletion job"""
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    job = await database.db.jobs.find_one({"_id": ObjectId(job_id)})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_summary(job)
+
+@router.post("/jobs/{job_id}/retry", status_code=status.HTTP_202_ACCEPTED)
+async def retry_job(job_id: str, admin: dict = Depends(require_admin)):
+    """Re-queue a failed job; it resumes at the step it failed on"""
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    db = database.db
+    if not await requeue(db, ObjectId(job_id)):
+        job = await db.jobs.find_one({"_id": ObjectId(job_id)}, {"status": 1})
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}, not failed")
+    return {"message": f"Job {job_id} re-queued", "job_id": job_id}
+
+def _project_filters(
+    project_status: Optional[str],
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+    min_budget: Optional[float],
+    max_budget: Optional[float]
+) -> dict:
+    query = {}
+    if project_status:
+        query["status"] = project_status
+    if created_from or created_to:
+        query["createdAt"] = {}
+        if created_from:
+            query["createdAt"]["$gte"] = created_from
+        if created_to:
+            query["createdAt"]["$lt"] = created_to
+    if min_budget is not None or max_budget is not None:
+        query["budget"] = {}
+        if min_budget is not None:
+            query["budget"]["$gte"] = min_budget
+        if max_budget is not None:
+            query["budget"]["$lte"] = max_budget
+    return query
+
+def _project_pipeline(query: dict, limit: Optional[int] = None) -> list:
+    """
+    Filter, sort and page projects first, then join client names and
+    proposal counts for just the returned rows.
+    """
+    pipeline = [{"$match": query}, {"$sort": {"_id": -1}}]
+    if limit:
+        pipeline.append({"$limit": limit})
+    pipeline += [
+        {"$lookup": {
+            "from": "users",
+            "let": {"clientId": {"$convert": {"input": "$clientId", "to": "objectId", "onError": None, "onNull": None}}},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$clientId"]}}},
+                {"$project": {"_id": 0, "name": 1}}
+            ],
+            "as": "client"
+        }},
+        # projectId may still be stored as a string (see utils/bson_compat.py).
+        # An array localField is an equality match on each element, so both
+        # forms are index lookups on proposals.projectId
+        {"$addFields": {"projectKeys": ["$_id", {"$toString": "$_id"}]}},
+        {"$lookup": {
+            "from": "proposals",
+            "localField": "projectKeys",
+            "foreignField": "projectId",
+            "pipeline": [{"$count": "n"}],
+            "as": "proposalCount"
+        }},
+        {"$project": {
+            "title": 1,
+            "status": 1,
+            "budget": 1,
+            "clientId": 1,
+            "createdAt": 1,
+            "client": {"$ifNull": [{"$first": "$client.name"}, "Unknown"]},
+            "proposals": {"$ifNull": [{"$first": "$proposalCount.n"}, 0]}
+        }}
+    ]
+    return pipeline
+
+def _project_row(p: dict) -> dict:
+    return {
+        "id": str(p["_id"]),
+        "title": p.get("title"),
+        "status": p.get("status"),
+        "budget": p.get("budget"),
+        "client": p["client"],
+        "client_id": id_str(p.get("clientId")),
+        "proposals": p["proposals"],
+        "created_at": p["createdAt"].isoformat() if p.get("createdAt") else None
+    }
 
 @router.get("/projects")
-async def get_all_projects(admin: dict = Depends(require_admin)):
-    """Get all projects in the system"""
-    # TODO: Implement database query
+async def get_all_projects(
+    admin: dict = Depends(require_admin),
+    project_status: Optional[str] = Query(None, alias="status"),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    min_budget: Optional[float] = Query(None, ge=0),
+    max_budget: Optional[float] = Query(None, ge=0),
+    after: Optional[str] = Query(None, description="Cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200)
+):
+    """
+    Get all projects in the system.
+    Newest first, with client names and proposal counts joined in the same
+    aggregation; pass next_cursor back as `after`.
+    """
+    query = _project_filters(project_status, created_from, created_to, min_budget, max_budget)
+    if after:
+        if not ObjectId.is_valid(after):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query["_id"] = {"$lt": ObjectId(after)}
+
+    projects = await database.db.projects.aggregate(_project_pipeline(query, limit)).to_list(limit)
+
     return {
-        "projects": [
-            {"id": "1", "title": "Kitchen Remodel", "status": "active", "client": "John Doe"},
-            {"id": "2", "title": "Bathroom Renovation", "status": "completed", "client": "Jane Smith"},
-        ],
-        "total": 2
+        "projects": [_project_row(p) for p in projects],
+        "next_cursor": str(projects[-1]["_id"]) if len(projects) == limit else None
     }
 
+CSV_COLUMNS = ["id", "title", "status", "budget", "client", "client_id", "proposals", "created_at"]
+
+@router.get("/projects/export.csv")
+@deadline(None)
+async def export_projects_csv(
+    admin: dict = Depends(require_admin),
+    project_status: Optional[str] = Query(None, alias="status"),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    min_budget: Optional[float] = Query(None, ge=0),
+    max_budget: Optional[float] = Query(None, ge=0)
+):
+    """Stream every matching project as CSV without buffering the result set"""
+    query = _project_filters(project_status, created_from, created_to, min_budget, max_budget)
+    cursor = database.db.projects.aggregate(_project_pipeline(query), batchSize=500)
+
+    async def rows():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        async for p in cursor:
+            writer.writerow(_project_row(p))
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    return StreamingResponse(
+        rows(),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=projects.csv"}
+    )
+
 @router.get("/analytics")
 async def get_platform_analytics(admin: dict = Depends(require_admin)):
-    """Get platform-wide analytics"""
-    # TODO: Implement analytics queries
+    """
+    Get platform-wide analytics.
+    Served from the precomputed rollups (utils/analytics.py); growth_rate is
+    new-user growth over the last 30 days vs the 30 before.
+    """
+    return await latest_snapshot(database.db)
+
+@router.get("/metrics")
+async def get_metrics(admin: dict = Depends(require_admin)):
+    """Per-process request health counters"""
     return {
-        "total_users": 1247,
-        "total_projects": 342,
-        "active_projects": 128,
-        "monthly_revenue": 45200,
-        "growth_rate": 12.5
+        "query_deadline_seconds": QUERY_DEADLINE_SECONDS,
+        "deadline_exceeded": dict(deadline_exceeded),
+        "database_circuit": database.breaker.snapshot()
     }
 
+class DisputeResolve(BaseModel):
+    resolution: str = Field(..., min_length=1, max_length=2000)
+
 @router.get("/disputes")
-async def get_disputes(admin: dict = Depends(require_admin)):
-    """Get all disputes that need resolution"""
-    # TODO: Implement disputes query
-    return {
-        "disputes": [
-            {"id": "1", "project": "Kitchen Remodel", "status": "pending", "raised_by": "client"},
-        ]
-    }
\ No newline at end of file
+async def get_disputes(
+    admin: dict = Depends(require_admin),
+    dispute_status: Literal["open", "resolved"] = Query("open", alias="status"),
+    limit: int = Query(50, ge=1, le=200)
+):
+    """Get disputes, highest priority and oldest first"""
+    disputes = await database.db.disputes.find(
+        {"status": dispute_status}
+    ).sort([("priority", -1), ("createdAt", 1)]).to_list(limit)
+    return {"disputes": [dispute_summary(d) for d in disputes]}
+
+@router.post("/disputes/claim")
+async def claim_dispute(
+    admin: dict = Depends(require_admin),
+    order: Literal["priority", "oldest"] = Query("priority")
+):
+    """
+    Claim the next dispute to work on.
+    The claim is a lease: resolve or release it before it expires, or it
+    returns to the queue for other admins.
+    """
+    dispute = await claim_next(database.db, admin["sub"], order)
+    if not dispute:
+        raise HTTPException(status_code=404, detail="No disputes waiting")
+    return dispute_summary(dispute)
+
+@router.post("/disputes/{dispute_id}/release")
+async def release_dispute(dispute_id: str, admin: dict = Depends(require_admin)):
+    """Return a claimed dispute to the queue"""
+    if not ObjectId.is_valid(dispute_id):
+        raise HTTPException(status_code=400, detail="Invalid dispute ID")
+    dispute = await release(database.db, dispute_id, admin["sub"])
+    if not dispute:
+        raise HTTPException(status_code=409, detail="Dispute is not claimed by you")
+    return dispute_summary(dispute)
+
+@router.post("/disputes/{dispute_id}/resolve")
+async def resolve_dispute(
+    dispute_id: str,
+    body: DisputeResolve,
+    admin: dict = Depends(require_admin)
+):
+    """Resolve a dispute you have claimed"""
+    if not ObjectId.is_valid(dispute_id):
+        raise HTTPException(status_code=400, detail="Invalid dispute ID")
+    dispute = await resolve(database.db, dispute_id, admin["sub"], body.resolution)
+    if not dispute:
+        raise HTTPException(status_code=409, detail="Dispute is not claimed by you or the claim expired")
+    return dispute_summary(dispute)
\ No newline at end of file
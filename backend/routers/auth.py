@@ -4,9 +4,12 @@ from passlib.context import CryptContext
 from jose import jwt
 from datetime import datetime, timedelta
 import database
+from utils.rate_limit import login_email_limiter
+from utils.deadlines import DeadlineRoute
+from utils.reviews import RATING_PRIOR_MEAN
 import os
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=DeadlineRoute)
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -123,6 +126,7 @@ async def register(user: UserRegister):
             "email": user.email,
             "password": hash_password(user.password),
             "role": user.role,
+            "status": "active",
             "createdAt": datetime.utcnow(),
             "updatedAt": datetime.utcnow()
         }
@@ -131,7 +135,8 @@ async def register(user: UserRegister):
         if user.role == "contractor":
             user_data.update({
                 "skills": [],
-                "rating": 0.0,
+                # Ranks new contractors at the prior until reviews arrive
+                "rating": RATING_PRIOR_MEAN,
                 "hourlyRate": 0.0,
                 "completedProjects": 0,
                 "bio": ""
@@ -171,6 +176,9 @@ async def login(credentials: UserLogin):
     try:
         print(f"🔍 Login attempt for email: {credentials.email}")
         
+        # Per-email throttle, checked before any database or bcrypt work
+        await login_email_limiter.check(credentials.email.lower())
+        
         # Get database instance
         db = database.db
         if db is None:
@@ -214,6 +222,14 @@ async def login(credentials: UserLogin):
                 detail="Incorrect email or password"
             )
         
+        # Only after the password matches, so the status never leaks to a guesser
+        if user.get("status") in ("suspended", "deleting"):
+            print(f"❌ Blocked login for {user.get('status')} account: {credentials.email}")
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Account is suspended"
+            )
+        
         # Create access token
         user_id = str(user["_id"])
         access_token = create_access_token(
@@ -249,7 +265,18 @@ async def debug_users():
         if db is None:
             return {"error": "Database not connected"}
         
-        users = await db.users.find({}).to_list(100)
+        # Password checks are computed server-side so hashes never leave Mongo
+        users = await db.users.aggregate([
+            {"$limit": 100},
+            {"$project": {
+                "name": 1,
+                "email": 1,
+                "role": 1,
+                "has_password": {"$ne": [{"$type": "$password"}, "missing"]},
+                "password_length": {"$strLenCP": {"$ifNull": ["$password", ""]}},
+                "fields": {"$map": {"input": {"$objectToArray": "$$ROOT"}, "in": "$$this.k"}}
+            }}
+        ]).to_list(100)
         
         # Don't return passwords, just structure
         result = []
@@ -259,9 +286,9 @@ async def debug_users():
                 "name": user.get("name"),
                 "email": user.get("email"),
                 "role": user.get("role"),
-                "has_password": "password" in user,
-                "password_length": len(user.get("password", "")) if "password" in user else 0,
-                "fields": list(user.keys())
+                "has_password": user["has_password"],
+                "password_length": user["password_length"],
+                "fields": user["fields"]
             })
         
         return {"users": result, "count": len(result)}
@@ -1,15 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import List, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from datetime import datetime
 from bson import ObjectId
 from jose import JWTError, jwt
+from pymongo.errors import BulkWriteError
 import os
 
-from database import db  # Assuming this exports the Motor database instance
-
-router = APIRouter(prefix="/client", tags=["Client"])
+import database
+from utils.auth import ensure_active_account
+from utils.earnings import record_acceptance, record_completion
+from utils.disputes import open_dispute, dispute_summary
+from utils.reviews import ReviewExists, add_review, record_completed_project, review_summary
+from utils.activity import make_event, push_to_users, publish_to_followers, safe_publish, skill_channels
+from utils.message_buckets import (
+    MESSAGE_BUCKET_WRITES, MESSAGE_BUCKET_READS, append_messages, latest_conversation, mark_read as mark_bucket_read
+)
+from utils.etag import make_etag, matches, not_modified, set_etag, fingerprint
+from utils.singleflight import single_flight
+from utils.deadlines import DeadlineRoute, deadline
+from utils.fallback import stale_fallback
+from utils.streaming import iter_json_array, iter_ndjson, StreamFormatError
+from utils.geo import point, lat_lng
+from utils.facets import RATING_BOUNDARIES, HOURLY_RATE_BOUNDARIES, normalize_filters, cached_facet_counts
+from utils.bson_compat import POSTED_DATE_FORMAT, id_value, id_match, ids_match, id_str, date_value, date_str
+
+router = APIRouter(prefix="/client", tags=["Client"], route_class=DeadlineRoute)
 security = HTTPBearer()
 
 # Load from environment (must match auth.py)
@@ -19,15 +36,30 @@ ALGORITHM = "HS256"
 if not SECRET_KEY:
     raise RuntimeError("JWT_SECRET environment variable is not set")
 
+# Bulk import tuning
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+IMPORT_MAX_REPORTED_ERRORS = 1000
+
+# How long coalesced browse/stats results are reused (seconds)
+SHARED_RESULT_TTL = float(os.getenv("SHARED_RESULT_TTL", "2"))
+# User fields shown in contractor browse; other updates (e.g. profileViews) keep cached pages
+BROWSE_FIELDS = {"full_name", "skills", "rating", "hourlyRate", "completedProjects", "bio", "role", "status"}
+
 # ────────────────────────────────────────────────
 # Pydantic Models
 # ────────────────────────────────────────────────
 
+class GeoLocation(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+
+
 class ProjectCreate(BaseModel):
     title: str = Field(..., min_length=1, max_length=200)
     description: str = Field(..., min_length=10)
     budget: float = Field(..., gt=0)
     skillsRequired: List[str] = Field(..., min_items=1)
+    location: Optional[GeoLocation] = None
 
     class Config:
         schema_extra = {
@@ -46,6 +78,7 @@ class ProjectUpdate(BaseModel):
     budget: Optional[float] = None
     skillsRequired: Optional[List[str]] = None
     status: Optional[str] = None  # e.g. "open", "in_progress", "completed"
+    location: Optional[GeoLocation] = None
 
 
 class ProjectResponse(BaseModel):
@@ -58,6 +91,19 @@ class ProjectResponse(BaseModel):
     postedDate: str
     proposals: int
     clientId: str
+    location: Optional[GeoLocation] = None
+
+
+class ProjectImportError(BaseModel):
+    row: int
+    error: str
+
+
+class ProjectImportResult(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    errors: List[ProjectImportError]
 
 
 class ContractorPublicProfile(BaseModel):
@@ -97,6 +143,46 @@ class MessageResponse(BaseModel):
     read: bool
 
 
+class DisputeCreate(BaseModel):
+    reason: str = Field(..., min_length=10, max_length=2000)
+
+
+class ReviewCreate(BaseModel):
+    rating: int = Field(..., ge=1, le=5)
+    comment: str = Field("", max_length=2000)
+
+
+class ArchivedMessagePage(BaseModel):
+    messages: List[MessageResponse]
+    next_cursor: Optional[str] = None
+
+
+class UnreadCount(BaseModel):
+    unread: int
+
+
+class MarkReadResult(BaseModel):
+    marked: int
+
+
+class SkillCount(BaseModel):
+    skill: str
+    count: int
+
+
+class FacetBucket(BaseModel):
+    min: float
+    max: Optional[float] = None  # None: open-ended
+    count: int
+
+
+class ContractorFacets(BaseModel):
+    total: int
+    skills: List[SkillCount]
+    rating: List[FacetBucket]
+    hourlyRate: List[FacetBucket]
+
+
 class DashboardStats(BaseModel):
     activeProjects: int
     totalProposals: int
@@ -121,66 +207,158 @@ async def get_current_client(credentials: HTTPAuthorizationCredentials = Depends
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Access denied. Client role required."
             )
-        
-        return user_id
-    
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    
+    # Suspended or deleting accounts are refused even with an unexpired token
+    await ensure_active_account(user_id)
+    return user_id
 
 
 # ────────────────────────────────────────────────
 # Project Endpoints
 # ────────────────────────────────────────────────
 
-@router.post("/projects", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
-async def create_project(
-    project: ProjectCreate,
-    client_id: str = Depends(get_current_client)
-):
-    project_data = {
+def new_project_document(project: ProjectCreate, client_id: str) -> dict:
+    now = datetime.utcnow()
+    document = {
         "title": project.title,
         "description": project.description,
         "budget": project.budget,
         "skillsRequired": project.skillsRequired,
         "status": "open",
-        "clientId": client_id,
-        "postedDate": datetime.utcnow().strftime("%Y-%m-%d"),
+        "clientId": id_value(client_id),
+        "postedDate": date_value(now, POSTED_DATE_FORMAT),
         "proposals": 0,
-        "createdAt": datetime.utcnow(),
-        "updatedAt": datetime.utcnow()
+        "createdAt": now,
+        "updatedAt": now
     }
+    if project.location:
+        document["location"] = point(project.location.longitude, project.location.latitude)
+    return document
+
+
+@router.post("/projects", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
+async def create_project(
+    project: ProjectCreate,
+    client_id: str = Depends(get_current_client)
+):
+    db = database.db
+    project_data = new_project_document(project, client_id)
+    
+    async with database.causal_write() as session:
+        result = await db.projects.insert_one(project_data, session=session)
+    
+    # Notify contractors with a matching skill
+    await safe_publish(
+        publish_to_followers, db,
+        skill_channels(project.skillsRequired),
+        {"role": "contractor", "skills": {"$in": project.skillsRequired}},
+        make_event("new_project", project.title, client_id, str(result.inserted_id))
+    )
     
-    result = await db.projects.insert_one(project_data)
-    
-    created = await db.projects.find_one({"_id": result.inserted_id})
-    
+    # insert_one sets _id on project_data - no need to read it back
     return ProjectResponse(
-        id=str(created["_id"]),
-        title=created["title"],
-        description=created["description"],
-        budget=created["budget"],
-        status=created["status"],
-        skillsRequired=created["skillsRequired"],
-        postedDate=created["postedDate"],
-        proposals=created.get("proposals", 0),
-        clientId=created["clientId"]
+        id=str(project_data["_id"]),
+        title=project_data["title"],
+        description=project_data["description"],
+        budget=project_data["budget"],
+        status=project_data["status"],
+        skillsRequired=project_data["skillsRequired"],
+        postedDate=date_str(project_data["postedDate"], POSTED_DATE_FORMAT),
+        proposals=project_data["proposals"],
+        clientId=id_str(project_data["clientId"]),
+        location=lat_lng(project_data.get("location"))
     )
 
 
+@router.post("/projects/import", response_model=ProjectImportResult)
+@deadline(None)
+async def import_projects(
+    request: Request,
+    client_id: str = Depends(get_current_client)
+):
+    """
+    Bulk-create projects from a JSON array (application/json) or NDJSON
+    (application/x-ndjson) upload. The body is parsed as it streams in and
+    inserted in unordered chunks, so memory stays bounded regardless of
+    upload size. Rows that fail validation or insertion are reported by
+    their 1-based position; the rest are imported.
+    """
+    db = database.db
+    content_type = request.headers.get("content-type", "")
+    parse = iter_ndjson if "ndjson" in content_type else iter_json_array
+    
+    result = ProjectImportResult(received=0, inserted=0, failed=0, errors=[])
+    
+    def fail(row: int, message: str):
+        result.failed += 1
+        if len(result.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            result.errors.append(ProjectImportError(row=row, error=message))
+    
+    async def flush(chunk: list):
+        try:
+            async with database.causal_write() as session:
+                inserted = await db.projects.insert_many([doc for _, doc in chunk], ordered=False, session=session)
+            result.inserted += len(inserted.inserted_ids)
+        except BulkWriteError as e:
+            result.inserted += e.details.get("nInserted", 0)
+            for err in e.details.get("writeErrors", []):
+                fail(chunk[err["index"]][0], err.get("errmsg", "Insert failed"))
+    
+    chunk = []
+    try:
+        async for row, item in parse(request.stream()):
+            result.received += 1
+            if isinstance(item, Exception):
+                fail(row, f"Invalid JSON: {item}")
+                continue
+            if not isinstance(item, dict):
+                fail(row, "Expected a JSON object")
+                continue
+            try:
+                project = ProjectCreate(**item)
+            except ValidationError as e:
+                fail(row, "; ".join(f"{'.'.join(str(l) for l in err['loc'])}: {err['msg']}" for err in e.errors()))
+                continue
+            chunk.append((row, new_project_document(project, client_id)))
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                await flush(chunk)
+                chunk = []
+    except StreamFormatError as e:
+        # Keep what was already imported and report where parsing stopped
+        fail(result.received + 1, str(e))
+    
+    if chunk:
+        await flush(chunk)
+    
+    return result
+
+
 @router.get("/projects", response_model=List[ProjectResponse])
 async def get_client_projects(
+    request: Request,
+    response: Response,
     client_id: str = Depends(get_current_client),
     status: Optional[str] = Query(None, description="Filter by status (open, in_progress, completed, etc.)")
 ):
-    query = {"clientId": client_id}
+    db = database.read_db
+    query = {"clientId": id_match(client_id)}
     if status:
         query["status"] = status
     
-    projects = await db.projects.find(query).sort("createdAt", -1).to_list(100)
+    async with database.causal_read() as session:
+        # ETag from newest updatedAt + count: covered by the (clientId, status, updatedAt) indexes
+        etag = make_etag("projects", client_id, status, *await fingerprint(db.projects, query, session))
+        if matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+        
+        projects = await db.projects.find(query, session=session).sort("createdAt", -1).to_list(100)
     
     return [
         ProjectResponse(
@@ -190,9 +368,10 @@ async def get_client_projects(
             budget=p["budget"],
             status=p["status"],
             skillsRequired=p["skillsRequired"],
-            postedDate=p["postedDate"],
+            postedDate=date_str(p["postedDate"], POSTED_DATE_FORMAT),
             proposals=p.get("proposals", 0),
-            clientId=p["clientId"]
+            clientId=id_str(p["clientId"]),
+            location=lat_lng(p.get("location"))
         )
         for p in projects
     ]
@@ -201,19 +380,30 @@ async def get_client_projects(
 @router.get("/projects/{project_id}", response_model=ProjectResponse)
 async def get_project(
     project_id: str,
+    request: Request,
+    response: Response,
     client_id: str = Depends(get_current_client)
 ):
+    db = database.db
     if not ObjectId.is_valid(project_id):
         raise HTTPException(status_code=400, detail="Invalid project ID")
     
-    project = await db.projects.find_one({
-        "_id": ObjectId(project_id),
-        "clientId": client_id
-    })
+    owned = {"_id": ObjectId(project_id), "clientId": id_match(client_id)}
+    if request.headers.get("if-none-match"):
+        # Revalidation only needs updatedAt - answered from the index alone
+        current = await db.projects.find_one(owned, {"_id": 0, "updatedAt": 1}, hint=database.PROJECT_REVALIDATION_INDEX)
+        if current:
+            etag = make_etag("project", project_id, current.get("updatedAt"))
+            if matches(request, etag):
+                return not_modified(etag)
+    
+    project = await db.projects.find_one(owned)
     
     if not project:
         raise HTTPException(status_code=404, detail="Project not found or not owned by you")
     
+    set_etag(response, make_etag("project", project_id, project.get("updatedAt")))
+    
     return ProjectResponse(
         id=str(project["_id"]),
         title=project["title"],
@@ -221,9 +411,10 @@ async def get_project(
         budget=project["budget"],
         status=project["status"],
         skillsRequired=project["skillsRequired"],
-        postedDate=project["postedDate"],
+        postedDate=date_str(project["postedDate"], POSTED_DATE_FORMAT),
         proposals=project.get("proposals", 0),
-        clientId=project["clientId"]
+        clientId=id_str(project["clientId"]),
+        location=lat_lng(project.get("location"))
     )
 
 
@@ -233,12 +424,13 @@ async def update_project(
     update_data: ProjectUpdate,
     client_id: str = Depends(get_current_client)
 ):
+    db = database.db
     if not ObjectId.is_valid(project_id):
         raise HTTPException(status_code=400, detail="Invalid project ID")
     
     project = await db.projects.find_one({
         "_id": ObjectId(project_id),
-        "clientId": client_id
+        "clientId": id_match(client_id)
     })
     
     if not project:
@@ -246,14 +438,32 @@ async def update_project(
     
     # Build update dict (only non-None fields)
     update_fields = {k: v for k, v in update_data.dict().items() if v is not None}
-    if update_fields:
-        update_fields["updatedAt"] = datetime.utcnow()
-        await db.projects.update_one(
-            {"_id": ObjectId(project_id)},
-            {"$set": update_fields}
-        )
-    
-    updated = await db.projects.find_one({"_id": ObjectId(project_id)})
+    if update_data.location:
+        update_fields["location"] = point(update_data.location.longitude, update_data.location.latitude)
+    
+    # The re-read must see this write, and so must the client's next listing
+    # reads on a replica: one causal session whose time goes back in a cookie
+    async with database.causal_write() as session:
+        if update_fields:
+            update_fields["updatedAt"] = datetime.utcnow()
+            completing = update_fields.get("status") == "completed"
+            target = {"_id": ObjectId(project_id)}
+            if completing:
+                # Only the request that actually moves the project to completed records it
+                target["status"] = {"$ne": "completed"}
+            result = await db.projects.update_one(target, {"$set": update_fields}, session=session)
+            if completing and result.matched_count == 0:
+                # Already completed (e.g. a concurrent or repeated request): apply the other fields only
+                await db.projects.update_one({"_id": ObjectId(project_id)}, {"$set": update_fields}, session=session)
+            
+            # Completing a project moves the accepted contractor's earnings out of pending
+            if completing and result.matched_count == 1:
+                accepted = await db.proposals.find_one({"projectId": id_match(project_id), "status": "accepted"})
+                if accepted:
+                    await record_completion(db, accepted)
+                    await record_completed_project(db, accepted["contractorId"])
+        
+        updated = await db.projects.find_one({"_id": ObjectId(project_id)}, session=session)
     
     return ProjectResponse(
         id=str(updated["_id"]),
@@ -262,9 +472,10 @@ async def update_project(
         budget=updated["budget"],
         status=updated["status"],
         skillsRequired=updated["skillsRequired"],
-        postedDate=updated["postedDate"],
+        postedDate=date_str(updated["postedDate"], POSTED_DATE_FORMAT),
         proposals=updated.get("proposals", 0),
-        clientId=updated["clientId"]
+        clientId=id_str(updated["clientId"]),
+        location=lat_lng(updated.get("location"))
     )
 
 
@@ -273,19 +484,21 @@ async def delete_project(
     project_id: str,
     client_id: str = Depends(get_current_client)
 ):
+    db = database.db
     if not ObjectId.is_valid(project_id):
         raise HTTPException(status_code=400, detail="Invalid project ID")
     
-    result = await db.projects.delete_one({
-        "_id": ObjectId(project_id),
-        "clientId": client_id
-    })
-    
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Project not found or not owned by you")
-    
-    # Clean up related proposals
-    await db.proposals.delete_many({"projectId": project_id})
+    async with database.causal_write() as session:
+        result = await db.projects.delete_one({
+            "_id": ObjectId(project_id),
+            "clientId": id_match(client_id)
+        }, session=session)
+        
+        if result.deleted_count == 0:
+            raise HTTPException(status_code=404, detail="Project not found or not owned by you")
+        
+        # Clean up related proposals
+        await db.proposals.delete_many({"projectId": id_match(project_id)}, session=session)
     
     return None
 
@@ -297,20 +510,30 @@ async def delete_project(
 @router.get("/projects/{project_id}/proposals", response_model=List[ProposalResponse])
 async def get_project_proposals(
     project_id: str,
+    request: Request,
+    response: Response,
     client_id: str = Depends(get_current_client)
 ):
+    db = database.read_db
     if not ObjectId.is_valid(project_id):
         raise HTTPException(status_code=400, detail="Invalid project ID")
     
-    project = await db.projects.find_one({
-        "_id": ObjectId(project_id),
-        "clientId": client_id
-    })
-    
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found or not owned by you")
-    
-    proposals = await db.proposals.find({"projectId": project_id}).sort("submittedDate", -1).to_list(50)
+    async with database.causal_read() as session:
+        project = await db.projects.find_one({
+            "_id": ObjectId(project_id),
+            "clientId": id_match(client_id)
+        }, {"_id": 1}, session=session)
+        
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found or not owned by you")
+        
+        etag = make_etag("proposals", project_id, *await fingerprint(db.proposals, {"projectId": id_match(project_id)}, session))
+        if matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+        
+        # Native dates sort above legacy strings, so newest-first holds while both exist
+        proposals = await db.proposals.find({"projectId": id_match(project_id)}, session=session).sort("submittedDate", -1).to_list(50)
     
     result = []
     for p in proposals:
@@ -319,14 +542,14 @@ async def get_project_proposals(
         
         result.append(ProposalResponse(
             id=str(p["_id"]),
-            projectId=p["projectId"],
-            contractorId=p["contractorId"],
+            projectId=id_str(p["projectId"]),
+            contractorId=id_str(p["contractorId"]),
             contractorName=name,
             coverLetter=p["coverLetter"],
             proposedBudget=p["proposedBudget"],
             estimatedDuration=p["estimatedDuration"],
             status=p["status"],
-            submittedDate=p["submittedDate"]
+            submittedDate=date_str(p["submittedDate"])
         ))
     
     return result
@@ -337,6 +560,7 @@ async def accept_proposal(
     proposal_id: str,
     client_id: str = Depends(get_current_client)
 ):
+    db = database.db
     if not ObjectId.is_valid(proposal_id):
         raise HTTPException(status_code=400, detail="Invalid proposal ID")
     
@@ -346,7 +570,7 @@ async def accept_proposal(
     
     project = await db.projects.find_one({
         "_id": ObjectId(proposal["projectId"]),
-        "clientId": client_id
+        "clientId": id_match(client_id)
     })
     if not project:
         raise HTTPException(status_code=403, detail="Unauthorized - project not owned by you")
@@ -354,22 +578,33 @@ async def accept_proposal(
     if project["status"] != "open":
         raise HTTPException(status_code=400, detail="Cannot accept proposal - project is no longer open")
     
-    # Accept this proposal
-    await db.proposals.update_one(
-        {"_id": ObjectId(proposal_id)},
-        {"$set": {"status": "accepted", "updatedAt": datetime.utcnow()}}
-    )
-    
-    # Update project
-    await db.projects.update_one(
-        {"_id": ObjectId(proposal["projectId"])},
-        {"$set": {"status": "in_progress", "updatedAt": datetime.utcnow()}}
-    )
+    async with database.causal_write() as session:
+        # Accept this proposal
+        await db.proposals.update_one(
+            {"_id": ObjectId(proposal_id)},
+            {"$set": {"status": "accepted", "updatedAt": datetime.utcnow()}},
+            session=session
+        )
+        
+        # Update project
+        await db.projects.update_one(
+            {"_id": ObjectId(proposal["projectId"])},
+            {"$set": {"status": "in_progress", "updatedAt": datetime.utcnow()}},
+            session=session
+        )
+        
+        # Reject all others
+        await db.proposals.update_many(
+            {"projectId": id_match(proposal["projectId"]), "_id": {"$ne": ObjectId(proposal_id)}},
+            {"$set": {"status": "rejected", "updatedAt": datetime.utcnow()}},
+            session=session
+        )
     
-    # Reject all others
-    await db.proposals.update_many(
-        {"projectId": proposal["projectId"], "_id": {"$ne": ObjectId(proposal_id)}},
-        {"$set": {"status": "rejected", "updatedAt": datetime.utcnow()}}
+    # Record pending earnings for the contractor
+    await record_acceptance(db, proposal)
+    await safe_publish(
+        push_to_users, db, [id_str(proposal["contractorId"])],
+        make_event("quote_accepted", project["title"], client_id, proposal_id)
     )
     
     # Return updated proposal
@@ -379,14 +614,14 @@ async def accept_proposal(
     
     return ProposalResponse(
         id=str(updated["_id"]),
-        projectId=updated["projectId"],
-        contractorId=updated["contractorId"],
+        projectId=id_str(updated["projectId"]),
+        contractorId=id_str(updated["contractorId"]),
         contractorName=name,
         coverLetter=updated["coverLetter"],
         proposedBudget=updated["proposedBudget"],
         estimatedDuration=updated["estimatedDuration"],
         status=updated["status"],
-        submittedDate=updated["submittedDate"]
+        submittedDate=date_str(updated["submittedDate"])
     )
 
 
@@ -395,6 +630,7 @@ async def reject_proposal(
     proposal_id: str,
     client_id: str = Depends(get_current_client)
 ):
+    db = database.db
     if not ObjectId.is_valid(proposal_id):
         raise HTTPException(status_code=400, detail="Invalid proposal ID")
     
@@ -404,14 +640,20 @@ async def reject_proposal(
     
     project = await db.projects.find_one({
         "_id": ObjectId(proposal["projectId"]),
-        "clientId": client_id
+        "clientId": id_match(client_id)
     })
     if not project:
         raise HTTPException(status_code=403, detail="Unauthorized")
     
-    await db.proposals.update_one(
-        {"_id": ObjectId(proposal_id)},
-        {"$set": {"status": "rejected", "updatedAt": datetime.utcnow()}}
+    async with database.causal_write() as session:
+        await db.proposals.update_one(
+            {"_id": ObjectId(proposal_id)},
+            {"$set": {"status": "rejected", "updatedAt": datetime.utcnow()}},
+            session=session
+        )
+    await safe_publish(
+        push_to_users, db, [id_str(proposal["contractorId"])],
+        make_event("quote_rejected", project["title"], client_id, proposal_id)
     )
     
     updated = await db.proposals.find_one({"_id": ObjectId(proposal_id)})
@@ -420,32 +662,87 @@ async def reject_proposal(
     
     return ProposalResponse(
         id=str(updated["_id"]),
-        projectId=updated["projectId"],
-        contractorId=updated["contractorId"],
+        projectId=id_str(updated["projectId"]),
+        contractorId=id_str(updated["contractorId"]),
         contractorName=name,
         coverLetter=updated["coverLetter"],
         proposedBudget=updated["proposedBudget"],
         estimatedDuration=updated["estimatedDuration"],
         status=updated["status"],
-        submittedDate=updated["submittedDate"]
+        submittedDate=date_str(updated["submittedDate"])
+    )
+
+
+@router.post("/projects/{project_id}/disputes", status_code=status.HTTP_201_CREATED)
+async def raise_dispute(
+    project_id: str,
+    dispute: DisputeCreate,
+    client_id: str = Depends(get_current_client)
+):
+    db = database.db
+    if not ObjectId.is_valid(project_id):
+        raise HTTPException(status_code=400, detail="Invalid project ID")
+    
+    project = await db.projects.find_one({
+        "_id": ObjectId(project_id),
+        "clientId": id_match(client_id)
+    })
+    
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found or not owned by you")
+    
+    created = await open_dispute(db, project, "client", client_id, dispute.reason)
+    return dispute_summary(created)
+
+
+@router.post("/projects/{project_id}/reviews", status_code=status.HTTP_201_CREATED)
+async def review_contractor(
+    project_id: str,
+    review: ReviewCreate,
+    client_id: str = Depends(get_current_client)
+):
+    """Rate the contractor who completed this project (once per project)"""
+    db = database.db
+    if not ObjectId.is_valid(project_id):
+        raise HTTPException(status_code=400, detail="Invalid project ID")
+    
+    project = await db.projects.find_one({
+        "_id": ObjectId(project_id),
+        "clientId": id_match(client_id)
+    }, {"clientId": 1, "status": 1})
+    
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found or not owned by you")
+    if project["status"] != "completed":
+        raise HTTPException(status_code=400, detail="Only completed projects can be reviewed")
+    
+    accepted = await db.proposals.find_one(
+        {"projectId": id_match(project_id), "status": "accepted"}, {"contractorId": 1}
     )
+    if not accepted:
+        raise HTTPException(status_code=400, detail="No contractor was hired for this project")
+    
+    try:
+        async with database.causal_write() as session:
+            created = await add_review(session, db, project, accepted["contractorId"], review.rating, review.comment)
+    except ReviewExists:
+        raise HTTPException(status_code=409, detail="This project has already been reviewed")
+    
+    return review_summary(created)
 
 
 # ────────────────────────────────────────────────
 # Contractor Browse
 # ────────────────────────────────────────────────
 
-@router.get("/contractors", response_model=List[ContractorPublicProfile])
-async def browse_contractors(
-    client_id: str = Depends(get_current_client),
-    skills: Optional[str] = Query(None),
-    min_rating: Optional[float] = Query(None, ge=0, le=5),
-    max_rate: Optional[float] = Query(None, ge=0)
-):
+def parse_skills(skills: Optional[str]) -> List[str]:
+    return [s.strip() for s in skills.split(",") if s.strip()] if skills else []
+
+
+def contractor_filters(skill_list: List[str], min_rating: Optional[float], max_rate: Optional[float]) -> dict:
     query = {"role": "contractor"}
     
-    if skills:
-        skill_list = [s.strip() for s in skills.split(",")]
+    if skill_list:
         query["skills"] = {"$in": skill_list}
     
     if min_rating is not None:
@@ -454,6 +751,32 @@ async def browse_contractors(
     if max_rate is not None:
         query["hourlyRate"] = {"$lte": max_rate}
     
+    return query
+
+
+def _browse_change(event: dict) -> Optional[dict]:
+    """Contractor changes that can alter browse results (every cached call)"""
+    doc = event["document"]
+    if doc.get("role") not in (None, "contractor"):
+        return None
+    if event["type"] == "update" and not {f.split(".")[0] for f in event["fields"]} & BROWSE_FIELDS:
+        return None
+    return {}
+
+
+@router.get("/contractors", response_model=List[ContractorPublicProfile])
+@single_flight(ttl=SHARED_RESULT_TTL, invalidate_on=["users"], scope=_browse_change)
+@stale_fallback(invalidate_on=["users"], scope=_browse_change)
+@deadline(2)
+async def browse_contractors(
+    client_id: str = Depends(get_current_client),
+    skills: Optional[str] = Query(None),
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    max_rate: Optional[float] = Query(None, ge=0)
+):
+    db = database.read_db
+    query = contractor_filters(parse_skills(skills), min_rating, max_rate)
+    
     contractors = await db.users.find(query).sort("rating", -1).to_list(50)
     
     return [
@@ -470,21 +793,52 @@ async def browse_contractors(
     ]
 
 
+@router.get("/contractors/facets", response_model=ContractorFacets)
+async def get_contractor_facets(
+    client_id: str = Depends(get_current_client),
+    skills: Optional[str] = Query(None),
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    max_rate: Optional[float] = Query(None, ge=0)
+):
+    """Sidebar counts for the contractor browse filters - one aggregation, briefly cached"""
+    skill_list = parse_skills(skills)
+    return await cached_facet_counts(
+        "contractors",
+        normalize_filters(skills=skill_list, min_rating=min_rating, max_rate=max_rate),
+        database.read_db.users,
+        contractor_filters(skill_list, min_rating, max_rate),
+        skill_field="skills",
+        buckets={"rating": RATING_BOUNDARIES, "hourlyRate": HOURLY_RATE_BOUNDARIES}
+    )
+
+
 # ────────────────────────────────────────────────
 # Dashboard Stats
 # ────────────────────────────────────────────────
 
+def _stats_change(event: dict) -> Optional[dict]:
+    """The client whose stats a change affects"""
+    if event["collection"] == "proposals":
+        # Only the proposal count is shown, and proposals carry no client id
+        return {} if event["type"] in ("insert", "delete") else None
+    client_id = event["document"].get("clientId")
+    return {"client_id": id_str(client_id)} if client_id else {}
+
+
 @router.get("/dashboard/stats", response_model=DashboardStats)
+@single_flight(ttl=SHARED_RESULT_TTL, invalidate_on=["projects", "proposals"], scope=_stats_change)
+@stale_fallback(invalidate_on=["projects", "proposals"], scope=_stats_change)
 async def get_dashboard_stats(client_id: str = Depends(get_current_client)):
-    projects = await db.projects.find({"clientId": client_id}).to_list(1000)
+    db = database.read_db
+    async with database.causal_read() as session:
+        projects = await db.projects.find({"clientId": id_match(client_id)}, session=session).to_list(1000)
+        project_ids = [str(p["_id"]) for p in projects]
+        total_proposals = await db.proposals.count_documents({"projectId": ids_match(project_ids)}, session=session)
     
     active = sum(1 for p in projects if p["status"] in ["open", "in_progress"])
     completed = sum(1 for p in projects if p["status"] == "completed")
     total_budget = sum(p["budget"] for p in projects)
     
-    project_ids = [str(p["_id"]) for p in projects]
-    total_proposals = await db.proposals.count_documents({"projectId": {"$in": project_ids}})
-    
     return DashboardStats(
         activeProjects=active,
         totalProposals=total_proposals,
@@ -502,6 +856,7 @@ async def send_message(
     message: MessageCreate,
     client_id: str = Depends(get_current_client)
 ):
+    db = database.db
     recipient = await db.users.find_one({"_id": ObjectId(message.recipientId)})
     if not recipient:
         raise HTTPException(status_code=404, detail="Recipient not found")
@@ -509,60 +864,152 @@ async def send_message(
     sender = await db.users.find_one({"_id": ObjectId(client_id)})
     
     msg_data = {
-        "senderId": client_id,
+        "senderId": id_value(client_id),
         "senderName": sender.get("full_name", "Unknown") if sender else "Unknown",
-        "recipientId": message.recipientId,
+        "recipientId": id_value(message.recipientId),
         "content": message.content,
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": date_value(datetime.utcnow()),
         "read": False,
         "createdAt": datetime.utcnow()
     }
     
+    if MESSAGE_BUCKET_WRITES:
+        msg_data["bucketed"] = True
+    
     result = await db.messages.insert_one(msg_data)
+    if MESSAGE_BUCKET_WRITES:
+        await append_messages(db, [{k: v for k, v in msg_data.items() if k != "bucketed"}])
+    await safe_publish(
+        push_to_users, db, [message.recipientId],
+        make_event("new_message", msg_data["senderName"], client_id, str(result.inserted_id))
+    )
     created = await db.messages.find_one({"_id": result.inserted_id})
     
     return MessageResponse(
         id=str(created["_id"]),
-        senderId=created["senderId"],
+        senderId=id_str(created["senderId"]),
         senderName=created["senderName"],
-        recipientId=created["recipientId"],
+        recipientId=id_str(created["recipientId"]),
         content=created["content"],
-        timestamp=created["timestamp"],
+        timestamp=date_str(created["timestamp"]),
         read=created["read"]
     )
 
 
 @router.get("/messages", response_model=List[MessageResponse])
+@deadline(2)
 async def get_messages(
     client_id: str = Depends(get_current_client),
     with_user: Optional[str] = Query(None, description="Filter conversation with specific user")
 ):
+    db = database.db
     if with_user:
         query = {
             "$or": [
-                {"senderId": client_id, "recipientId": with_user},
-                {"senderId": with_user, "recipientId": client_id}
+                {"senderId": id_match(client_id), "recipientId": id_match(with_user)},
+                {"senderId": id_match(with_user), "recipientId": id_match(client_id)}
             ]
         }
     else:
         query = {
             "$or": [
-                {"senderId": client_id},
-                {"recipientId": client_id}
+                {"senderId": id_match(client_id)},
+                {"recipientId": id_match(client_id)}
             ]
         }
     
-    messages = await db.messages.find(query).sort("createdAt", -1).to_list(100)
+    if with_user and MESSAGE_BUCKET_READS:
+        messages = await latest_conversation(db, client_id, with_user, limit=100)
+    else:
+        messages = await db.messages.find(query).sort("createdAt", -1).to_list(100)
     
     return [
         MessageResponse(
             id=str(m["_id"]),
-            senderId=m["senderId"],
+            senderId=id_str(m["senderId"]),
             senderName=m["senderName"],
-            recipientId=m["recipientId"],
+            recipientId=id_str(m["recipientId"]),
             content=m["content"],
-            timestamp=m["timestamp"],
+            timestamp=date_str(m["timestamp"]),
             read=m["read"]
         )
         for m in messages
-    ]
\ No newline at end of file
+    ]
+
+
+@router.get("/messages/unread-count", response_model=UnreadCount)
+async def get_unread_count(
+    client_id: str = Depends(get_current_client),
+    from_user: Optional[str] = Query(None, description="Only count messages from this user")
+):
+    """Unread badge count - one count over the partial {recipientId, senderId} unread index"""
+    db = database.db
+    query = {"recipientId": id_match(client_id), "read": False}
+    if from_user:
+        query["senderId"] = id_match(from_user)
+    
+    return UnreadCount(unread=await db.messages.count_documents(query))
+
+
+@router.put("/messages/read", response_model=MarkReadResult)
+async def mark_conversation_read(
+    client_id: str = Depends(get_current_client),
+    with_user: str = Query(..., description="Mark every message from this user as read")
+):
+    db = database.db
+    result = await db.messages.update_many(
+        {"recipientId": id_match(client_id), "senderId": id_match(with_user), "read": False},
+        {"$set": {"read": True, "readAt": datetime.utcnow()}}
+    )
+    if MESSAGE_BUCKET_WRITES:
+        await mark_bucket_read(db, client_id, with_user)
+    
+    return MarkReadResult(marked=result.modified_count)
+
+
+@router.get("/messages/archive", response_model=ArchivedMessagePage)
+async def get_archived_messages(
+    client_id: str = Depends(get_current_client),
+    with_user: Optional[str] = Query(None, description="Filter conversation with specific user"),
+    before: Optional[str] = Query(None, description="Cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200)
+):
+    """Messages moved out of the live collection by the retention job, newest first"""
+    db = database.db
+    if with_user:
+        query = {
+            "$or": [
+                {"senderId": id_match(client_id), "recipientId": id_match(with_user)},
+                {"senderId": id_match(with_user), "recipientId": id_match(client_id)}
+            ]
+        }
+    else:
+        query = {
+            "$or": [
+                {"senderId": id_match(client_id)},
+                {"recipientId": id_match(client_id)}
+            ]
+        }
+    
+    if before:
+        if not ObjectId.is_valid(before):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query["_id"] = {"$lt": ObjectId(before)}
+    
+    messages = await db.messages_archive.find(query).sort("_id", -1).to_list(limit)
+    
+    return ArchivedMessagePage(
+        messages=[
+            MessageResponse(
+                id=str(m["_id"]),
+                senderId=id_str(m["senderId"]),
+                senderName=m["senderName"],
+                recipientId=id_str(m["recipientId"]),
+                content=m["content"],
+                timestamp=date_str(m["timestamp"]),
+                read=m["read"]
+            )
+            for m in messages
+        ],
+        next_cursor=str(messages[-1]["_id"]) if len(messages) == limit else None
+    )
\ No newline at end of file
@@ -1,9 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from pydantic import BaseModel, Field
 from typing import List, Optional
+from bson import ObjectId
+from datetime import datetime
+import asyncio
+import functools
+import os
 from utils.auth import get_current_user
+from utils.activity import get_feed, skill_channels
+from utils.bson_compat import POSTED_DATE_FORMAT, id_match, id_str, date_str
+from utils.cache import TTLCache
+from utils.deadlines import DeadlineRoute
+from utils.disputes import open_dispute, dispute_summary
+from utils.earnings import get_summary
+from utils.facets import BUDGET_BOUNDARIES, normalize_filters, cached_facet_counts
+from utils.geo import DEFAULT_RADIUS_KM, MAX_RADIUS_KM, point, lat_lng, parse_location, projects_near
+from utils.invalidation import invalidation_bus
+from utils.progress_buffer import progress_buffer
+from utils.search import build_search_query, search_projects
+import database
 
-router = APIRouter(prefix="/contractor", tags=["Contractor"])
+router = APIRouter(prefix="/contractor", tags=["Contractor"], route_class=DeadlineRoute)
 
 # Dependency to ensure only contractors can access these routes
 async def require_contractor(current_user: dict = Depends(get_current_user)):
@@ -22,56 +39,211 @@ class QuoteCreate(BaseModel):
     description: str
     materials_included: bool = True
 
+class DisputeCreate(BaseModel):
+    reason: str = Field(..., min_length=10, max_length=2000)
+
+class ServiceArea(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    radius_km: float = Field(..., gt=0, le=MAX_RADIUS_KM)
+
 class ProfileUpdate(BaseModel):
     bio: Optional[str] = None
     hourly_rate: Optional[float] = None
     specialties: Optional[List[str]] = None
     certifications: Optional[List[str]] = None
+    service_area: Optional[ServiceArea] = None
+
+# Dashboard tuning
+DASHBOARD_DEADLINE_SECONDS = float(os.getenv("DASHBOARD_DEADLINE_SECONDS", "1.5"))
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "15"))
+RECENT_ACTIVITY_LIMIT = 5
+
+# contractor_id -> {"dashboard", "projects": active project ids, "skills"}; the
+# dependencies let a project change drop only the dashboards it affects
+dashboard_cache = TTLCache(ttl=DASHBOARD_CACHE_TTL)
+
+# (project_id, contractor_id) pairs already verified as assigned
+assignment_cache = TTLCache(ttl=300)
+
+
+def _invalidate_contractor_caches(event: dict):
+    """Drop cached dashboards/assignments changed by any worker (utils/invalidation.py)"""
+    doc = event["document"]
+    if event["type"] == "reset" or (event["type"] == "delete" and event["collection"] == "proposals"):
+        # Proposal deletes carry no owner ids
+        dashboard_cache.clear()
+        assignment_cache.clear()
+    elif event["collection"] == "users":
+        dashboard_cache.invalidate(str(event["id"]))
+    elif event["collection"] == "proposals":
+        contractor_id = id_str(doc.get("contractorId"))
+        dashboard_cache.invalidate(contractor_id)
+        if doc.get("status") != "accepted":
+            assignment_cache.invalidate((id_str(doc.get("projectId")), contractor_id))
+    elif event["collection"] == "projects":
+        # Active job counts follow the status of the contractor's projects;
+        # a new project lands in the recent activity of matching skills
+        project_id = str(event["id"])
+        skills = set(doc.get("skillsRequired") or [])
+        if event["type"] == "insert":
+            dashboard_cache.invalidate_where(lambda key, entry: bool(entry["skills"] & skills))
+        elif event["type"] in ("delete", "replace") or "status" in event["fields"]:
+            dashboard_cache.invalidate_where(lambda key, entry: project_id in entry["projects"])
+
+
+invalidation_bus.subscribe(["users", "projects", "proposals"], _invalidate_contractor_caches)
+
+# ────────────────────────────────────────────────
+# Dashboard sub-queries (run concurrently)
+# ────────────────────────────────────────────────
+
+async def _within_deadline(name: str, query) -> tuple:
+    """Run one sub-query under the dashboard deadline; returns (ok, value)"""
+    try:
+        return True, await asyncio.wait_for(query, timeout=DASHBOARD_DEADLINE_SECONDS)
+    except asyncio.TimeoutError:
+        print(f"⏱️ Dashboard sub-query {name} missed the deadline")
+    except Exception as e:
+        print(f"❌ Dashboard sub-query {name} failed: {e}")
+    return False, None
+
+
+async def _count_active_jobs(db, contractor_id: str, depends_on: dict) -> int:
+    accepted = await db.proposals.find(
+        {"contractorId": id_match(contractor_id), "status": "accepted"},
+        {"projectId": 1}
+    ).to_list(None)
+    project_ids = [ObjectId(p["projectId"]) for p in accepted if ObjectId.is_valid(p["projectId"])]
+    depends_on["projects"] = {str(i) for i in project_ids}
+    if not project_ids:
+        return 0
+    return await db.projects.count_documents({"_id": {"$in": project_ids}, "status": "in_progress"})
+
+
+async def _count_pending_quotes(db, contractor_id: str) -> int:
+    return await db.proposals.count_documents({"contractorId": id_match(contractor_id), "status": "pending"})
+
+
+async def _total_earnings(db, contractor_id: str) -> float:
+    summary = await get_summary(db, contractor_id, months=0)
+    return summary["total_earnings"]
+
+
+async def _profile_views(db, contractor_id: str) -> int:
+    if not ObjectId.is_valid(contractor_id):
+        return 0
+    user = await db.users.find_one({"_id": ObjectId(contractor_id)}, {"profileViews": 1})
+    return user.get("profileViews", 0) if user else 0
+
+
+async def _recent_activity(db, contractor_id: str, depends_on: dict) -> list:
+    skills = []
+    if ObjectId.is_valid(contractor_id):
+        user = await db.users.find_one({"_id": ObjectId(contractor_id)}, {"skills": 1})
+        skills = user.get("skills", []) if user else []
+    depends_on["skills"] = set(skills)
+
+    events = await get_feed(db, contractor_id, skill_channels(skills), limit=RECENT_ACTIVITY_LIMIT)
+    return [
+        {"type": e["type"], "title": e["title"], "time": e["createdAt"].isoformat()}
+        for e in events
+    ]
 
 @router.get("/dashboard")
 async def get_contractor_dashboard(contractor: dict = Depends(require_contractor)):
-    """Get contractor dashboard overview"""
-    # TODO: Implement database queries
-    return {
-        "active_jobs": 5,
-        "total_earnings": 28340,
-        "profile_views": 142,
-        "pending_quotes": 3,
-        "recent_activity": [
-            {"type": "new_project", "title": "Deck Construction", "time": "1 hour ago"},
-            {"type": "quote_accepted", "title": "Kitchen Remodel", "time": "3 hours ago"},
-        ]
+    """
+    Get contractor dashboard overview.
+    Sub-queries run concurrently under one deadline; any that miss it are
+    reported in "unavailable" with a fallback value, and partial responses
+    are not cached.
+    """
+    contractor_id = contractor["sub"]
+    cached = dashboard_cache.get(contractor_id)
+    if cached is not None:
+        return cached["dashboard"]
+
+    db = database.db
+    depends_on = {"projects": set(), "skills": set()}
+    sub_queries = {
+        "active_jobs": (functools.partial(_count_active_jobs, depends_on=depends_on), 0),
+        "total_earnings": (_total_earnings, 0),
+        "profile_views": (_profile_views, 0),
+        "pending_quotes": (_count_pending_quotes, 0),
+        "recent_activity": (functools.partial(_recent_activity, depends_on=depends_on), []),
     }
+    results = await asyncio.gather(*[
+        _within_deadline(name, query(db, contractor_id))
+        for name, (query, _) in sub_queries.items()
+    ])
+
+    dashboard = {}
+    unavailable = []
+    for name, (ok, value) in zip(sub_queries, results):
+        if ok:
+            dashboard[name] = value
+        else:
+            dashboard[name] = sub_queries[name][1]
+            unavailable.append(name)
+
+    dashboard["unavailable"] = unavailable
+    if not unavailable:
+        dashboard_cache.set(contractor_id, {"dashboard": dashboard, **depends_on})
+    return dashboard
 
 @router.get("/projects/available")
 async def browse_available_projects(
-    category: Optional[str] = None,
-    location: Optional[str] = None,
+    category: Optional[str] = Query(None, description="Only projects needing this skill"),
+    location: Optional[str] = Query(None, description="Search centre as '<lat>,<lng>'; defaults to your service area"),
+    radius_km: Optional[float] = Query(None, gt=0, le=MAX_RADIUS_KM),
+    skills: Optional[str] = Query(None, description="Comma-separated skills (any match)"),
+    min_budget: Optional[float] = Query(None, ge=0),
+    max_budget: Optional[float] = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     contractor: dict = Depends(require_contractor)
 ):
-    """Browse available projects to bid on"""
-    # TODO: Implement database query with filters
+    """Browse open projects near a location, nearest first"""
+    db = database.db
+    area = None
+    if location:
+        try:
+            center = parse_location(location)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="location must be '<lat>,<lng>'")
+    else:
+        user = await db.users.find_one({"_id": ObjectId(contractor["sub"])}, {"serviceArea": 1})
+        area = user.get("serviceArea") if user else None
+        if not area:
+            raise HTTPException(status_code=400, detail="Pass a location or set a service area on your profile")
+        center = area["center"]
+
+    skill_list = [s.strip() for s in skills.split(",") if s.strip()] if skills else []
+    if category:
+        skill_list.append(category)
+    radius = radius_km or (area["radiusKm"] if area else DEFAULT_RADIUS_KM)
+
+    try:
+        projects, next_cursor = await projects_near(
+            db, center, radius, skill_list, min_budget, max_budget, limit, cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
     return {
         "projects": [
             {
-                "id": "1",
-                "title": "Kitchen Remodel",
-                "category": "Kitchen & Bath",
-                "budget": 15000,
-                "location": "New York, NY",
-                "posted": "2 days ago",
-                "client_rating": 4.5
-            },
-            {
-                "id": "2",
-                "title": "Deck Construction",
-                "category": "Outdoor",
-                "budget": 8000,
-                "location": "Brooklyn, NY",
-                "posted": "5 hours ago",
-                "client_rating": 4.8
+                "id": str(p["_id"]),
+                "title": p["title"],
+                "budget": p["budget"],
+                "skillsRequired": p.get("skillsRequired", []),
+                "location": lat_lng(p.get("location")),
+                "distance_km": round(p["distance"] / 1000, 2),
+                "posted": date_str(p.get("postedDate"), POSTED_DATE_FORMAT)
             }
-        ]
+            for p in projects
+        ],
+        "next_cursor": next_cursor
     }
 
 @router.get("/projects/active")
@@ -101,6 +273,57 @@ async def get_active_jobs(contractor: dict = Depends(require_contractor)):
         ]
     }
 
+@router.get("/projects/search")
+async def search_available_projects(
+    q: str = Query(..., min_length=2, max_length=200),
+    skills: Optional[str] = Query(None, description="Comma-separated skills"),
+    min_budget: Optional[float] = Query(None, ge=0),
+    max_budget: Optional[float] = Query(None, ge=0),
+    project_status: str = Query("open", alias="status"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    contractor: dict = Depends(require_contractor)
+):
+    """Full-text search over project titles, descriptions and skills, ranked by relevance"""
+    skill_list = [s.strip() for s in skills.split(",") if s.strip()] if skills else None
+    query = build_search_query(q, project_status, skill_list, min_budget, max_budget)
+    projects = await search_projects(database.db, query, limit, offset)
+    return {
+        "projects": [
+            {
+                "id": str(p["_id"]),
+                "title": p["title"],
+                "description": p["description"],
+                "budget": p["budget"],
+                "skillsRequired": p.get("skillsRequired", []),
+                "status": p["status"],
+                "posted": date_str(p.get("postedDate"), POSTED_DATE_FORMAT),
+                "score": round(p["score"], 3)
+            }
+            for p in projects
+        ]
+    }
+
+@router.get("/projects/facets")
+async def get_project_facets(
+    q: Optional[str] = Query(None, min_length=2, max_length=200),
+    skills: Optional[str] = Query(None, description="Comma-separated skills"),
+    min_budget: Optional[float] = Query(None, ge=0),
+    max_budget: Optional[float] = Query(None, ge=0),
+    project_status: str = Query("open", alias="status"),
+    contractor: dict = Depends(require_contractor)
+):
+    """Sidebar counts (skills, budget buckets) for the project search filters"""
+    skill_list = [s.strip() for s in skills.split(",") if s.strip()] if skills else None
+    return await cached_facet_counts(
+        "projects",
+        normalize_filters(q=q, skills=skill_list, min_budget=min_budget, max_budget=max_budget, status=project_status),
+        database.read_db.projects,
+        build_search_query(q, project_status, skill_list, min_budget, max_budget),
+        skill_field="skillsRequired",
+        buckets={"budget": BUDGET_BOUNDARIES}
+    )
+
 @router.get("/projects/{project_id}")
 async def get_job_details(project_id: str, contractor: dict = Depends(require_contractor)):
     """Get detailed information about a specific job"""
@@ -174,7 +397,21 @@ async def update_profile(
     contractor: dict = Depends(require_contractor)
 ):
     """Update contractor profile"""
-    # TODO: Implement profile update in database
+    fields = {
+        "bio": profile.bio,
+        "hourlyRate": profile.hourly_rate,
+        # Specialties are the skills that browse, search and dashboard matching read
+        "skills": profile.specialties,
+        "certifications": profile.certifications,
+    }
+    update = {k: v for k, v in fields.items() if v is not None}
+    if profile.service_area:
+        area = profile.service_area
+        update["serviceArea"] = {"center": point(area.longitude, area.latitude), "radiusKm": area.radius_km}
+
+    if update:
+        update["updatedAt"] = datetime.utcnow()
+        await database.db.users.update_one({"_id": ObjectId(contractor["sub"])}, {"$set": update})
     return {
         "message": "Profile updated successfully",
         "profile": profile.dict(exclude_none=True)
@@ -183,28 +420,60 @@ async def update_profile(
 @router.get("/earnings")
 async def get_earnings_summary(contractor: dict = Depends(require_contractor)):
     """Get earnings summary and history"""
-    # TODO: Implement earnings calculation
-    return {
-        "total_earnings": 28340,
-        "this_month": 8450,
-        "pending": 3500,
-        "history": [
-            {"month": "January 2026", "amount": 8450},
-            {"month": "December 2025", "amount": 9200}
-        ]
-    }
+    return await get_summary(database.db, contractor["sub"])
 
 @router.post("/projects/{project_id}/update-progress")
 async def update_project_progress(
     project_id: str,
-    progress: int,
+    progress: int = Query(..., ge=0, le=100),
     notes: Optional[str] = None,
     contractor: dict = Depends(require_contractor)
 ):
-    """Update project progress"""
-    # TODO: Implement progress update and verify contractor owns project
+    """
+    Update project progress.
+    Updates are buffered and coalesced per project before being written
+    (see utils/progress_buffer.py), so the response acknowledges receipt.
+    """
+    if not ObjectId.is_valid(project_id):
+        raise HTTPException(status_code=400, detail="Invalid project ID")
+
+    db = database.db
+    key = (project_id, contractor["sub"])
+    if assignment_cache.get(key) is None:
+        assigned = await db.proposals.find_one(
+            {"projectId": id_match(project_id), "contractorId": id_match(contractor["sub"]), "status": "accepted"},
+            {"_id": 1}
+        )
+        if not assigned:
+            raise HTTPException(status_code=403, detail="You are not assigned to this project")
+        assignment_cache.set(key, True)
+
+    await progress_buffer.record(db, project_id, progress, notes)
+
     return {
         "message": "Progress updated successfully",
         "project_id": project_id,
         "new_progress": progress
-    }
\ No newline at end of file
+    }
+
+@router.post("/projects/{project_id}/disputes", status_code=status.HTTP_201_CREATED)
+async def raise_dispute(
+    project_id: str,
+    dispute: DisputeCreate,
+    contractor: dict = Depends(require_contractor)
+):
+    """Raise a dispute on a project you are assigned to"""
+    if not ObjectId.is_valid(project_id):
+        raise HTTPException(status_code=400, detail="Invalid project ID")
+
+    db = database.db
+    assigned = await db.proposals.find_one(
+        {"projectId": id_match(project_id), "contractorId": id_match(contractor["sub"]), "status": "accepted"},
+        {"_id": 1}
+    )
+    project = await db.projects.find_one({"_id": ObjectId(project_id)}, {"title": 1, "budget": 1})
+    if not assigned or not project:
+        raise HTTPException(status_code=403, detail="You are not assigned to this project")
+
+    created = await open_dispute(db, project, "contractor", contractor["sub"], dispute.reason)
+    return dispute_summary(created)
\ No newline at end of file
@@ -0,0 +1,24 @@
+"""
+Set unreviewed contractors' rating to the prior mean, so they no longer
+rank below contractors with a single poor review.
+
+Usage (from the backend directory):
+    python -m scripts.backfill_ratings
+"""
+import asyncio
+
+import database
+from utils.reviews import RATING_PRIOR_MEAN, backfill_unreviewed_ratings
+
+
+async def main():
+    await database.connect_to_mongo()
+    try:
+        updated = await backfill_unreviewed_ratings(database.db)
+        print(f"✅ Set {updated} unreviewed contractors to a rating of {RATING_PRIOR_MEAN}")
+    finally:
+        await database.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+Benchmark project search latency against a synthetic data set.
+
+Seeds N projects into a scratch database (<DATABASE_NAME>_bench), builds
+the same text index the API uses and reports p50/p95/p99 latency for a
+set of representative searches.
+
+Usage (from the backend directory):
+    python -m scripts.bench_project_search [--projects 1000000] [--runs 200] [--keep]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from database import MONGO_URI, DATABASE_NAME
+from utils.search import ensure_text_index, build_search_query, search_projects
+
+SKILLS = ["React", "Node.js", "MongoDB", "Python", "Plumbing", "Electrical", "Carpentry",
+          "Roofing", "Painting", "Tiling", "Landscaping", "Drywall", "HVAC", "Flooring"]
+NOUNS = ["kitchen", "bathroom", "deck", "website", "roof", "garden", "basement", "fence",
+         "patio", "dashboard", "storefront", "garage", "staircase", "attic", "driveway"]
+VERBS = ["remodel", "build", "repair", "install", "renovate", "replace", "design", "paint"]
+FILLER = ["modern", "small", "large", "urgent", "custom", "full", "budget", "premium",
+          "residential", "commercial", "outdoor", "indoor", "eco", "quick"]
+QUERIES = ["kitchen remodel", "deck", "roof repair", "website design", "bathroom tiling",
+           "garden landscaping", "install hvac", "paint garage"]
+
+
+def fake_project(i: int) -> dict:
+    words = random.sample(FILLER, 2) + [random.choice(VERBS), random.choice(NOUNS)]
+    status = random.choices(["open", "in_progress", "completed"], weights=[5, 2, 3])[0]
+    return {
+        "title": " ".join(words).capitalize(),
+        "description": " ".join(random.choices(FILLER + NOUNS + VERBS, k=30)),
+        "budget": round(random.uniform(100, 50000), 2),
+        "skillsRequired": random.sample(SKILLS, random.randint(1, 4)),
+        "status": status,
+        "clientId": f"{i % 50000:024x}",
+        "postedDate": datetime.utcnow().strftime("%Y-%m-%d"),
+        "proposals": 0,
+        "createdAt": datetime.utcnow(),
+        "updatedAt": datetime.utcnow()
+    }
+
+
+async def seed(db, count: int, batch_size: int = 10000):
+    existing = await db.projects.estimated_document_count()
+    if existing >= count:
+        print(f"Using {existing} existing projects")
+        return
+    for start in range(existing, count, batch_size):
+        batch = [fake_project(i) for i in range(start, min(start + batch_size, count))]
+        await db.projects.insert_many(batch, ordered=False)
+        print(f"  seeded {start + len(batch)}/{count}", end="\r")
+    print()
+
+
+async def bench(db, runs: int):
+    latencies = []
+    for i in range(runs):
+        q = QUERIES[i % len(QUERIES)]
+        skills = random.sample(SKILLS, 2) if i % 3 == 0 else None
+        min_budget = 1000 if i % 4 == 0 else None
+        query = build_search_query(q, "open", skills, min_budget, None)
+        started = time.perf_counter()
+        await search_projects(db, query, limit=20)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+    print(f"runs={runs} mean={statistics.mean(latencies):.1f}ms "
+          f"p50={pct(0.50):.1f}ms p95={pct(0.95):.1f}ms p99={pct(0.99):.1f}ms")
+
+
+async def main(projects: int, runs: int, keep: bool):
+    client = AsyncIOMotorClient(MONGO_URI)
+    db = client[f"{DATABASE_NAME}_bench"]
+    try:
+        await seed(db, projects)
+        print("Building text index...")
+        await ensure_text_index(db)
+        await bench(db, runs)
+    finally:
+        if not keep:
+            await client.drop_database(db.name)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark project text search")
+    parser.add_argument("--projects", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database for re-runs")
+    args = parser.parse_args()
+    asyncio.run(main(args.projects, args.runs, args.keep))
@@ -0,0 +1,32 @@
+"""
+Copy flat messages into conversation buckets.
+
+Run after enabling MESSAGE_BUCKET_WRITES and before MESSAGE_BUCKET_READS.
+Messages written live are already bucketed and skipped; the script can be
+stopped and re-run at any point.
+
+Usage (from the backend directory):
+    python -m scripts.migrate_message_buckets [--batch-size 1000]
+"""
+import argparse
+import asyncio
+
+import database
+from utils.message_buckets import migrate_flat_messages
+
+
+async def main(batch_size: int):
+    await database.connect_to_mongo()
+    try:
+        await database.ensure_indexes()
+        migrated = await migrate_flat_messages(database.db, batch_size=batch_size)
+        print(f"✅ Migrated {migrated} messages into buckets")
+    finally:
+        await database.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate flat messages into conversation buckets")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Messages per batch")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1,33 @@
+"""
+Convert string reference ids and dates to native ObjectId/datetime values.
+
+Run after deploying with NATIVE_BSON_WRITES=true, so no new strings are
+written behind the migration. It works in small batches against a live
+database and can be stopped and re-run at any point.
+
+Usage (from the backend directory):
+    python -m scripts.migrate_native_types [--collection proposals] [--batch-size 1000]
+"""
+import argparse
+import asyncio
+
+import database
+from utils.bson_compat import ID_FIELDS, migrate_collection
+
+
+async def main(collections, batch_size: int):
+    await database.connect_to_mongo()
+    try:
+        for name in collections:
+            converted = await migrate_collection(database.db, name, batch_size=batch_size)
+            print(f"✅ {name}: {converted} documents converted")
+    finally:
+        await database.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate string ids and dates to native BSON types")
+    parser.add_argument("--collection", choices=sorted(ID_FIELDS), help="Only migrate this collection")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents per batch")
+    args = parser.parse_args()
+    asyncio.run(main([args.collection] if args.collection else list(ID_FIELDS), args.batch_size))
@@ -0,0 +1,27 @@
+"""
+Recompute earnings rollups from the append-only ledger.
+
+Usage (from the backend directory):
+    python -m scripts.rebuild_earnings [--batch-size 500]
+"""
+import argparse
+import asyncio
+
+import database
+from utils.earnings import rebuild_rollups
+
+
+async def main(batch_size: int):
+    await database.connect_to_mongo()
+    try:
+        rebuilt = await rebuild_rollups(database.db, batch_size=batch_size)
+        print(f"✅ Rebuilt earnings rollups for {rebuilt} contractors")
+    finally:
+        await database.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild earnings rollups from the ledger")
+    parser.add_argument("--batch-size", type=int, default=500, help="Contractors per batch")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1,23 @@
+"""
+Run one platform analytics rollup immediately.
+
+Usage (from the backend directory):
+    python -m scripts.rollup_analytics
+"""
+import asyncio
+
+import database
+from utils.analytics import run_rollup
+
+
+async def main():
+    await database.connect_to_mongo()
+    try:
+        await run_rollup(database.db)
+        print("✅ Analytics rollup complete")
+    finally:
+        await database.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
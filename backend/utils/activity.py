@@ -0,0 +1,99 @@
+from datetime import datetime
+from typing import Iterable, List, Optional
+from pymongo import UpdateOne
+import os
+
+# ────────────────────────────────────────────────
+# Activity feeds
+#
+# activity_feeds   one capped document per user ({_id: userId, events: [...]}),
+#                  newest first - filled on write
+# activity_events  shared events tagged with channels (e.g. "skill:React"),
+#                  merged into a reader's feed at read time
+#
+# ACTIVITY_FANOUT_MODE picks the strategy for channel events:
+#   "write" - always push into every follower's feed
+#   "read"  - always store once and merge on read
+#   "auto"  - push while the audience is at most ACTIVITY_FANOUT_WRITE_MAX
+# ────────────────────────────────────────────────
+
+FEED_SIZE = int(os.getenv("ACTIVITY_FEED_SIZE", "50"))
+FANOUT_MODE = os.getenv("ACTIVITY_FANOUT_MODE", "auto")
+FANOUT_WRITE_MAX = int(os.getenv("ACTIVITY_FANOUT_WRITE_MAX", "1000"))
+
+
+def make_event(event_type: str, title: str, actor_id: str, ref_id: Optional[str] = None) -> dict:
+    """Compact feed entry"""
+    return {
+        "type": event_type,
+        "title": title,
+        "actorId": actor_id,
+        "refId": ref_id,
+        "createdAt": datetime.utcnow()
+    }
+
+
+async def push_to_users(db, user_ids: Iterable[str], event: dict):
+    """Fan-out on write: prepend the event to each user's capped feed"""
+    ops = [
+        UpdateOne(
+            {"_id": user_id},
+            {"$push": {"events": {"$each": [event], "$position": 0, "$slice": FEED_SIZE}}},
+            upsert=True
+        )
+        for user_id in set(user_ids)
+        if user_id != event["actorId"]
+    ]
+    if ops:
+        await db.activity_feeds.bulk_write(ops, ordered=False)
+
+
+async def publish_to_followers(db, channels: List[str], follower_query: dict, event: dict):
+    """
+    Publish an event to everyone matching follower_query.
+    Small audiences are pushed into their feeds; large ones get a single
+    channel event that readers merge in (see get_feed).
+    """
+    fan_out_on_write = FANOUT_MODE == "write"
+    if FANOUT_MODE == "auto":
+        # Bounded count - we only need to know if we're over the threshold
+        audience = await db.users.count_documents(follower_query, limit=FANOUT_WRITE_MAX + 1)
+        fan_out_on_write = audience <= FANOUT_WRITE_MAX
+
+    if fan_out_on_write:
+        followers = await db.users.find(follower_query, {"_id": 1}).to_list(None)
+        await push_to_users(db, [str(f["_id"]) for f in followers], event)
+    else:
+        await db.activity_events.insert_one({**event, "channels": channels})
+
+
+async def safe_publish(publish, *args):
+    """Activity is best effort - never fail the originating write"""
+    try:
+        await publish(*args)
+    except Exception as e:
+        print(f"❌ Activity publish failed: {e}")
+
+
+async def get_feed(db, user_id: str, channels: Iterable[str] = (), limit: int = 20) -> List[dict]:
+    """Newest-first feed: the user's capped feed plus any followed channel events"""
+    feed = await db.activity_feeds.find_one(
+        {"_id": user_id},
+        {"events": {"$slice": limit}}
+    )
+    events = feed.get("events", []) if feed else []
+
+    channels = list(channels)
+    if channels:
+        shared = await db.activity_events.find(
+            {"channels": {"$in": channels}, "actorId": {"$ne": user_id}},
+            {"_id": 0, "channels": 0}
+        ).sort("createdAt", -1).to_list(limit)
+        events = sorted(events + shared, key=lambda e: e["createdAt"], reverse=True)
+
+    return events[:limit]
+
+
+def skill_channels(skills: Iterable[str]) -> List[str]:
+    """Channel names contractors follow for new projects"""
+    return [f"skill:{s}" for s in skills]
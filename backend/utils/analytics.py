@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta
+from pymongo import ReadPreference
+import asyncio
+import os
+from utils.leases import acquire_lease
+
+# ────────────────────────────────────────────────
+# Platform analytics rollups
+#
+# analytics_hourly  {_id: "YYYY-MM-DDTHH", new_users, new_projects, revenue}
+# analytics_daily   {_id: "YYYY-MM-DD", new_users, new_projects, revenue,
+#                    total_users, total_projects, active_projects}
+# analytics_state   {_id: "watermark", hour}
+#
+# Each run only aggregates documents created since the last processed hour
+# and $merges the result, reading from secondaries where available.
+# ────────────────────────────────────────────────
+
+ANALYTICS_ROLLUP_INTERVAL = float(os.getenv("ANALYTICS_ROLLUP_INTERVAL", "300"))
+ANALYTICS_BACKFILL_DAYS = int(os.getenv("ANALYTICS_BACKFILL_DAYS", "60"))
+GROWTH_WINDOW_DAYS = 30
+
+HOUR_FORMAT = "%Y-%m-%dT%H"
+DAY_FORMAT = "%Y-%m-%d"
+
+
+def _secondary(db, name: str):
+    return db.get_collection(name, read_preference=ReadPreference.SECONDARY_PREFERRED)
+
+
+def _merge_hourly(match: dict, date_field: str, value: dict) -> list:
+    """Pipeline grouping matching docs by hour and merging one counter into analytics_hourly"""
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {"$dateToString": {"format": HOUR_FORMAT, "date": f"${date_field}"}},
+            **value
+        }},
+        {"$merge": {"into": "analytics_hourly", "on": "_id", "whenMatched": "merge", "whenNotMatched": "insert"}}
+    ]
+
+
+async def run_rollup(db):
+    """Aggregate everything created since the last processed hour into the rollups"""
+    now = datetime.utcnow()
+    state = await db.analytics_state.find_one({"_id": "watermark"})
+    if state:
+        # Re-aggregate the last (possibly partial) hour
+        start = datetime.strptime(state["hour"], HOUR_FORMAT)
+    else:
+        start = (now - timedelta(days=ANALYTICS_BACKFILL_DAYS)).replace(minute=0, second=0, microsecond=0)
+    window = {"$gte": start, "$lt": now}
+
+    await _secondary(db, "users").aggregate(
+        _merge_hourly({"createdAt": window}, "createdAt", {"new_users": {"$sum": 1}})
+    ).to_list(None)
+    await _secondary(db, "projects").aggregate(
+        _merge_hourly({"createdAt": window}, "createdAt", {"new_projects": {"$sum": 1}})
+    ).to_list(None)
+    await _secondary(db, "earnings_ledger").aggregate(
+        _merge_hourly({"type": "completed", "createdAt": window}, "createdAt", {"revenue": {"$sum": "$amount"}})
+    ).to_list(None)
+
+    # Fold the touched hours into their days - from the primary, which the $merges above just wrote
+    await db.analytics_hourly.aggregate([
+        {"$match": {"_id": {"$gte": start.strftime(DAY_FORMAT)}}},
+        {"$group": {
+            "_id": {"$substrBytes": ["$_id", 0, 10]},
+            "new_users": {"$sum": {"$ifNull": ["$new_users", 0]}},
+            "new_projects": {"$sum": {"$ifNull": ["$new_projects", 0]}},
+            "revenue": {"$sum": {"$ifNull": ["$revenue", 0]}}
+        }},
+        {"$merge": {"into": "analytics_daily", "on": "_id", "whenMatched": "merge", "whenNotMatched": "insert"}}
+    ]).to_list(None)
+
+    # Point-in-time totals for today; both counts are metadata or index-only
+    projects = _secondary(db, "projects")
+    await db.analytics_daily.update_one(
+        {"_id": now.strftime(DAY_FORMAT)},
+        {"$set": {
+            "total_users": await _secondary(db, "users").estimated_document_count(),
+            "total_projects": await projects.estimated_document_count(),
+            "active_projects": await projects.count_documents({"status": {"$in": ["open", "in_progress"]}}),
+            "updatedAt": now
+        }},
+        upsert=True
+    )
+
+    await db.analytics_state.update_one(
+        {"_id": "watermark"},
+        {"$set": {"hour": now.strftime(HOUR_FORMAT)}},
+        upsert=True
+    )
+
+
+async def run_scheduler(get_db, interval: float = ANALYTICS_ROLLUP_INTERVAL):
+    """Background loop started from main.startup_event"""
+    while True:
+        try:
+            db = get_db()
+            # Only one worker runs the rollup per interval
+            if await acquire_lease(db, "analytics_rollup", interval):
+                await run_rollup(db)
+        except Exception as e:
+            print(f"❌ Analytics rollup failed: {e}")
+        await asyncio.sleep(interval)
+
+
+async def latest_snapshot(db) -> dict:
+    """Latest totals plus 30-day revenue and user growth from the daily series"""
+    latest = await db.analytics_daily.find_one({"total_users": {"$exists": True}}, sort=[("_id", -1)])
+    if not latest:
+        return {
+            "total_users": 0,
+            "total_projects": 0,
+            "active_projects": 0,
+            "monthly_revenue": 0,
+            "growth_rate": 0.0,
+            "as_of": None
+        }
+
+    # Windows are calendar days - days without activity have no document
+    today = datetime.utcnow()
+    current_from = (today - timedelta(days=GROWTH_WINDOW_DAYS - 1)).strftime(DAY_FORMAT)
+    previous_from = (today - timedelta(days=2 * GROWTH_WINDOW_DAYS - 1)).strftime(DAY_FORMAT)
+    days = await db.analytics_daily.find(
+        {"_id": {"$gte": previous_from}},
+        {"new_users": 1, "revenue": 1}
+    ).to_list(None)
+    current = [d for d in days if d["_id"] >= current_from]
+    previous = [d for d in days if d["_id"] < current_from]
+
+    new_now = sum(d.get("new_users", 0) for d in current)
+    new_before = sum(d.get("new_users", 0) for d in previous)
+    growth_rate = round((new_now - new_before) / new_before * 100, 1) if new_before else 0.0
+
+    return {
+        "total_users": latest.get("total_users", 0),
+        "total_projects": latest.get("total_projects", 0),
+        "active_projects": latest.get("active_projects", 0),
+        "monthly_revenue": sum(d.get("revenue", 0) for d in current),
+        "growth_rate": growth_rate,
+        "as_of": latest["_id"]
+    }
@@ -3,8 +3,13 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
+from bson import ObjectId
 import os
 
+import database
+from utils.cache import TTLCache
+from utils.invalidation import invalidation_bus
+
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -16,6 +21,12 @@ SECRET_KEY = os.getenv("JWT_SECRET", "your-secret-key")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_EXPIRE_MINUTES", "1440"))
 
+# Suspended/deleting accounts are refused even with an unexpired token.
+# Statuses are cached briefly and dropped on user changes (utils/invalidation.py).
+ACCOUNT_STATUS_CACHE_SECONDS = float(os.getenv("ACCOUNT_STATUS_CACHE_SECONDS", "10"))
+BLOCKED_STATUSES = ("suspended", "deleting")
+account_status_cache = TTLCache(ttl=ACCOUNT_STATUS_CACHE_SECONDS)
+
 def get_password_hash(password: str) -> str:
     """Hash a plain password"""
     return pwd_context.hash(password)
@@ -36,6 +47,36 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+async def ensure_active_account(user_id: str):
+    """Raise 401 for a deleted account and 403 for a suspended or deleting one"""
+    account_status = account_status_cache.get(user_id)
+    if account_status is None:
+        user = None
+        if ObjectId.is_valid(user_id):
+            user = await database.db.users.find_one({"_id": ObjectId(user_id)}, {"status": 1})
+        account_status = user.get("status", "active") if user else "missing"
+        account_status_cache.set(user_id, account_status)
+
+    if account_status == "missing":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Account no longer exists",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if account_status in BLOCKED_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="This account has been suspended"
+        )
+
+def _forget_account_status(event: dict):
+    if event["type"] == "reset":
+        account_status_cache.clear()
+    else:
+        account_status_cache.invalidate(str(event["id"]))
+
+invalidation_bus.subscribe(["users"], _forget_account_status)
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     """
     Verify JWT token and return user payload
@@ -55,15 +96,16 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
         
         if user_id is None or role is None:
             raise credentials_exception
-            
-        return {
-            "sub": user_id,
-            "role": role,
-            "email": payload.get("email")
-        }
     except JWTError:
         raise credentials_exception
 
+    await ensure_active_account(user_id)
+    return {
+        "sub": user_id,
+        "role": role,
+        "email": payload.get("email")
+    }
+
 def require_role(required_role: str):
     """
     Dependency factory to require a specific role
@@ -0,0 +1,148 @@
+from datetime import datetime
+from typing import Any, Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+import asyncio
+import os
+
+# ────────────────────────────────────────────────
+# String -> native BSON transition
+#
+# Reference ids (projects.clientId, proposals.projectId/contractorId,
+# messages.senderId/recipientId) move from hex strings to ObjectId, and
+# postedDate/submittedDate/timestamp from strings to datetimes.
+#
+# Rollout:
+#   1. deploy with NATIVE_BSON_WRITES=false - reads accept both forms
+#   2. set NATIVE_BSON_WRITES=true         - new documents use native types
+#   3. run scripts/migrate_native_types.py - converts the remaining strings
+# Responses keep their string formats throughout.
+# ────────────────────────────────────────────────
+
+NATIVE_BSON_WRITES = os.getenv("NATIVE_BSON_WRITES", "false").lower() == "true"
+
+POSTED_DATE_FORMAT = "%Y-%m-%d"
+
+
+def id_value(value: str) -> Any:
+    """Representation to store for a reference id"""
+    if NATIVE_BSON_WRITES and ObjectId.is_valid(value):
+        return ObjectId(value)
+    return value
+
+
+def id_match(value: Any) -> Any:
+    """Query value matching a reference id stored either way"""
+    value = str(value)
+    if ObjectId.is_valid(value):
+        return {"$in": [value, ObjectId(value)]}
+    return value
+
+
+def ids_match(values) -> dict:
+    """$in matching a list of reference ids stored either way"""
+    matches = []
+    for value in map(str, values):
+        matches.append(value)
+        if ObjectId.is_valid(value):
+            matches.append(ObjectId(value))
+    return {"$in": matches}
+
+
+def id_str(value: Any) -> Optional[str]:
+    """Reference id as the API's string form"""
+    return None if value is None else str(value)
+
+
+def date_value(when: datetime, legacy_format: Optional[str] = None) -> Any:
+    """Representation to store for a date field (legacy: strftime, or isoformat)"""
+    if NATIVE_BSON_WRITES:
+        return when
+    return when.strftime(legacy_format) if legacy_format else when.isoformat()
+
+
+def date_str(value: Any, legacy_format: Optional[str] = None) -> Optional[str]:
+    """Date field as the API's string form, whichever way it was stored"""
+    if isinstance(value, datetime):
+        return value.strftime(legacy_format) if legacy_format else value.isoformat()
+    return value
+
+
+def parse_legacy_date(value: str) -> datetime:
+    """Parse a stored date string (ISO timestamp or YYYY-MM-DD)"""
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return datetime.strptime(value, POSTED_DATE_FORMAT)
+
+
+# ────────────────────────────────────────────────
+# Online migration
+# ────────────────────────────────────────────────
+
+ID_FIELDS = {
+    "projects": ["clientId"],
+    "proposals": ["projectId", "contractorId"],
+    "messages": ["senderId", "recipientId"],
+    "messages_archive": ["senderId", "recipientId"],
+}
+DATE_FIELDS = {
+    "projects": ["postedDate"],
+    "proposals": ["submittedDate"],
+    "messages": ["timestamp"],
+    "messages_archive": ["timestamp"],
+}
+
+MIGRATION_THROTTLE_SECONDS = float(os.getenv("MIGRATION_THROTTLE_SECONDS", "0.05"))
+
+
+def _native_fields(name: str, doc: dict) -> dict:
+    """Converted values for the fields of doc still stored as strings"""
+    converted = {}
+    for field in ID_FIELDS.get(name, []):
+        value = doc.get(field)
+        if isinstance(value, str) and ObjectId.is_valid(value):
+            converted[field] = ObjectId(value)
+    for field in DATE_FIELDS.get(name, []):
+        value = doc.get(field)
+        if isinstance(value, str):
+            try:
+                converted[field] = parse_legacy_date(value)
+            except ValueError:
+                pass
+    return converted
+
+
+async def migrate_collection(db, name: str, batch_size: int = 1000) -> int:
+    """
+    Convert one collection's string ids/dates in _id order. Each update is
+    conditional on the old string still being there, so it never overwrites
+    a concurrent change; unconvertible values are left as they are. Safe to
+    stop and re-run; returns the number of documents converted.
+    """
+    fields = ID_FIELDS.get(name, []) + DATE_FIELDS.get(name, [])
+    collection = db[name]
+    converted = 0
+    last_id = None
+    while True:
+        query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await collection.find(
+            query, {field: 1 for field in fields}
+        ).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            return converted
+        last_id = batch[-1]["_id"]
+
+        ops = []
+        for doc in batch:
+            native = _native_fields(name, doc)
+            if native:
+                expected = {field: doc[field] for field in native}
+                ops.append(UpdateOne({"_id": doc["_id"], **expected}, {"$set": native}))
+        if ops:
+            result = await collection.bulk_write(ops, ordered=False)
+            converted += result.modified_count
+        print(f"🔁 {name}: converted {converted} documents")
+        await asyncio.sleep(MIGRATION_THROTTLE_SECONDS)
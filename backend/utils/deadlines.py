@@ -0,0 +1,79 @@
+from collections import Counter
+from fastapi import HTTPException, status
+from fastapi.routing import APIRoute
+from pymongo.errors import PyMongoError
+import asyncio
+import os
+import pymongo
+
+import database
+
+# ────────────────────────────────────────────────
+# Per-route deadlines
+#
+# Routers built with route_class=DeadlineRoute run every handler under a
+# time budget (QUERY_DEADLINE_SECONDS unless the endpoint sets its own with
+# @deadline). Inside the budget pymongo.timeout() applies: each Motor call
+# gets the remaining time as maxTimeMS, and so does the wait for a pool
+# connection. When the budget runs out the handler is cancelled and the
+# client gets a 504. While the database circuit breaker is open, requests
+# fail fast with 503 before the handler runs.
+# ────────────────────────────────────────────────
+
+QUERY_DEADLINE_SECONDS = float(os.getenv("QUERY_DEADLINE_SECONDS", "5"))
+
+# "<METHOD> <path>" -> requests that ran out of time; served by /admin/metrics
+deadline_exceeded = Counter()
+
+
+def deadline(seconds):
+    """
+    Override the route's budget; None disables it (streaming uploads/exports).
+
+    Place directly above the handler:
+        @router.get("/contractors")
+        @deadline(2)
+        async def browse_contractors(...):
+    """
+    def decorator(func):
+        func.deadline_seconds = seconds
+        return func
+    return decorator
+
+
+def _timed_out(e: BaseException) -> bool:
+    return isinstance(e, asyncio.TimeoutError) or (isinstance(e, PyMongoError) and e.timeout)
+
+
+class DeadlineRoute(APIRoute):
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        seconds = getattr(self.endpoint, "deadline_seconds", QUERY_DEADLINE_SECONDS)
+        # Endpoints with a stale fallback check the circuit themselves
+        guarded = not getattr(self.endpoint, "serves_stale", False)
+        name = f"{','.join(sorted(self.methods))} {self.path}"
+
+        async def run(request):
+            with pymongo.timeout(seconds):
+                return await handler(request)
+
+        async def deadline_handler(request):
+            if guarded:
+                database.ensure_available()
+            if not seconds:
+                return await handler(request)
+            try:
+                return await asyncio.wait_for(run(request), timeout=seconds)
+            except (asyncio.TimeoutError, PyMongoError) as e:
+                if not _timed_out(e):
+                    raise
+                deadline_exceeded[name] += 1
+                # Pool waits never reach the command listener - count them against the circuit here
+                database.breaker.record(True)
+                print(f"⏱️ {name} exceeded its {seconds}s deadline")
+                raise HTTPException(
+                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                    detail="The request took too long. Please try again."
+                )
+
+        return deadline_handler
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+import os
+
+# ────────────────────────────────────────────────
+# Disputes queue
+#
+# disputes  {projectId, projectTitle, raisedBy, raisedById, reason, priority,
+#            status: open|resolved, availableAt, claimedBy, resolution, createdAt}
+#
+# An open dispute is claimable once availableAt has passed. Claiming pushes
+# availableAt out by the lease, so an abandoned claim expires on its own.
+# Claims follow the (status, priority, createdAt, availableAt) index -
+# equality, sort, then range - so the next item is found in O(log n).
+# ────────────────────────────────────────────────
+
+DISPUTE_LEASE_SECONDS = int(os.getenv("DISPUTE_LEASE_SECONDS", "900"))
+
+CLAIM_ORDERS = {
+    "priority": [("priority", -1), ("createdAt", 1)],
+    "oldest": [("createdAt", 1)],
+}
+
+
+def priority_for(project: dict) -> int:
+    """Larger projects are worked first"""
+    budget = project.get("budget", 0)
+    if budget >= 10000:
+        return 3
+    if budget >= 1000:
+        return 2
+    return 1
+
+
+async def open_dispute(db, project: dict, raised_by: str, raised_by_id: str, reason: str) -> dict:
+    now = datetime.utcnow()
+    dispute = {
+        "projectId": str(project["_id"]),
+        "projectTitle": project.get("title"),
+        "raisedBy": raised_by,
+        "raisedById": raised_by_id,
+        "reason": reason,
+        "priority": priority_for(project),
+        "status": "open",
+        "availableAt": now,
+        "claimedBy": None,
+        "createdAt": now,
+        "updatedAt": now
+    }
+    result = await db.disputes.insert_one(dispute)
+    dispute["_id"] = result.inserted_id
+    return dispute
+
+
+async def claim_next(db, admin_id: str, order: str = "priority") -> Optional[dict]:
+    """Atomically lease the next available dispute to admin_id"""
+    now = datetime.utcnow()
+    return await db.disputes.find_one_and_update(
+        {"status": "open", "availableAt": {"$lte": now}},
+        {"$set": {
+            "claimedBy": admin_id,
+            "availableAt": now + timedelta(seconds=DISPUTE_LEASE_SECONDS),
+            "updatedAt": now
+        }},
+        sort=CLAIM_ORDERS[order],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def _held_by(dispute_id: str, admin_id: str) -> dict:
+    return {
+        "_id": ObjectId(dispute_id),
+        "status": "open",
+        "claimedBy": admin_id,
+        "availableAt": {"$gt": datetime.utcnow()}
+    }
+
+
+async def release(db, dispute_id: str, admin_id: str) -> Optional[dict]:
+    """Hand a claimed dispute back to the queue"""
+    now = datetime.utcnow()
+    return await db.disputes.find_one_and_update(
+        _held_by(dispute_id, admin_id),
+        {"$set": {"claimedBy": None, "availableAt": now, "updatedAt": now}},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def resolve(db, dispute_id: str, admin_id: str, resolution: str) -> Optional[dict]:
+    """Resolve a dispute; only the admin holding a live lease may do this"""
+    now = datetime.utcnow()
+    return await db.disputes.find_one_and_update(
+        _held_by(dispute_id, admin_id),
+        {"$set": {"status": "resolved", "resolution": resolution, "resolvedAt": now, "updatedAt": now}},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def dispute_summary(d: dict) -> dict:
+    now = datetime.utcnow()
+    claimed = d["status"] == "open" and d.get("claimedBy") and d["availableAt"] > now
+    return {
+        "id": str(d["_id"]),
+        "project_id": d["projectId"],
+        "project": d.get("projectTitle"),
+        "raised_by": d["raisedBy"],
+        "reason": d["reason"],
+        "priority": d["priority"],
+        "status": "claimed" if claimed else ("pending" if d["status"] == "open" else d["status"]),
+        "claimed_by": d.get("claimedBy") if claimed else None,
+        "lease_expires": d["availableAt"].isoformat() if claimed else None,
+        "resolution": d.get("resolution"),
+        "created_at": d["createdAt"].isoformat()
+    }
@@ -0,0 +1,208 @@
+from datetime import datetime
+from pymongo import UpdateOne, ReplaceOne, DeleteMany
+from pymongo.errors import DuplicateKeyError
+
+# ────────────────────────────────────────────────
+# Earnings ledger
+#
+# earnings_ledger   append-only, one entry per (proposalId, type)
+# earnings_rollups  one document per contractor and period, where period is
+#                   "YYYY-MM" for monthly earned amounts or "total" for the
+#                   running totals (earned + pending)
+#
+# Ledger and rollup ids are always strings, however the proposal stores them.
+# ────────────────────────────────────────────────
+
+TOTAL_PERIOD = "total"
+HISTORY_MONTHS = 12
+
+LEDGER_ACCEPTED = "accepted"
+LEDGER_COMPLETED = "completed"
+
+
+def period_for(when: datetime) -> str:
+    """Monthly rollup key for a timestamp"""
+    return when.strftime("%Y-%m")
+
+
+def period_label(period: str) -> str:
+    """Human readable month for a rollup key, e.g. 'January 2026'"""
+    return datetime.strptime(period, "%Y-%m").strftime("%B %Y")
+
+
+async def _append(db, entry: dict) -> bool:
+    """Insert a ledger entry; returns False if it was already recorded"""
+    try:
+        await db.earnings_ledger.insert_one(entry)
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+async def record_acceptance(db, proposal: dict):
+    """Ledger + rollup update when a client accepts a proposal"""
+    now = datetime.utcnow()
+    amount = float(proposal.get("proposedBudget", 0))
+    entry = {
+        "contractorId": str(proposal["contractorId"]),
+        "projectId": str(proposal["projectId"]),
+        "proposalId": str(proposal["_id"]),
+        "type": LEDGER_ACCEPTED,
+        "amount": amount,
+        "period": period_for(now),
+        "createdAt": now
+    }
+    if not await _append(db, entry):
+        return
+
+    await db.earnings_rollups.update_one(
+        {"contractorId": entry["contractorId"], "period": TOTAL_PERIOD},
+        {"$inc": {"pending": amount}, "$set": {"updatedAt": now}},
+        upsert=True
+    )
+
+
+async def record_completion(db, proposal: dict):
+    """Ledger + rollup update when an accepted proposal's project completes"""
+    # Proposals accepted before the ledger existed have no acceptance entry
+    await record_acceptance(db, proposal)
+
+    now = datetime.utcnow()
+    amount = float(proposal.get("proposedBudget", 0))
+    period = period_for(now)
+    entry = {
+        "contractorId": str(proposal["contractorId"]),
+        "projectId": str(proposal["projectId"]),
+        "proposalId": str(proposal["_id"]),
+        "type": LEDGER_COMPLETED,
+        "amount": amount,
+        "period": period,
+        "createdAt": now
+    }
+    if not await _append(db, entry):
+        return
+
+    await db.earnings_rollups.bulk_write([
+        UpdateOne(
+            {"contractorId": entry["contractorId"], "period": TOTAL_PERIOD},
+            {"$inc": {"pending": -amount, "earned": amount}, "$set": {"updatedAt": now}},
+            upsert=True
+        ),
+        UpdateOne(
+            {"contractorId": entry["contractorId"], "period": period},
+            {"$inc": {"earned": amount, "jobs": 1}, "$set": {"updatedAt": now}},
+            upsert=True
+        )
+    ], ordered=False)
+
+
+async def get_summary(db, contractor_id: str, months: int = HISTORY_MONTHS) -> dict:
+    """
+    Earnings summary and monthly history in a single indexed read.
+    The "total" rollup sorts after every "YYYY-MM" key, so a descending
+    scan on (contractorId, period) returns it first, followed by the
+    most recent months.
+    """
+    rollups = await db.earnings_rollups.find(
+        {"contractorId": contractor_id},
+        {"_id": 0, "period": 1, "earned": 1, "pending": 1}
+    ).sort("period", -1).to_list(months + 1)
+
+    totals = {}
+    history = []
+    for r in rollups:
+        if r["period"] == TOTAL_PERIOD:
+            totals = r
+        else:
+            history.append(r)
+    history = history[:months]
+
+    current = period_for(datetime.utcnow())
+    this_month = next((r.get("earned", 0) for r in history if r["period"] == current), 0)
+
+    return {
+        "total_earnings": totals.get("earned", 0),
+        "this_month": this_month,
+        "pending": totals.get("pending", 0),
+        "history": [
+            {"month": period_label(r["period"]), "amount": r.get("earned", 0)}
+            for r in history
+        ]
+    }
+
+
+async def rebuild_rollups(db, batch_size: int = 500) -> int:
+    """
+    Recompute every rollup from the ledger, batch_size contractors at a time.
+    Returns the number of contractors rebuilt.
+    """
+    rebuilt = 0
+    last_contractor = None
+
+    while True:
+        match = {} if last_contractor is None else {"contractorId": {"$gt": last_contractor}}
+        # $sort before $group lets the server walk (contractorId, _id) as a distinct scan
+        batch = await db.earnings_ledger.aggregate([
+            {"$match": match},
+            {"$sort": {"contractorId": 1}},
+            {"$group": {"_id": "$contractorId"}},
+            {"$sort": {"_id": 1}},
+            {"$limit": batch_size}
+        ]).to_list(batch_size)
+        if not batch:
+            break
+
+        contractor_ids = [b["_id"] for b in batch]
+        last_contractor = contractor_ids[-1]
+
+        groups = await db.earnings_ledger.aggregate([
+            {"$match": {"contractorId": {"$in": contractor_ids}}},
+            {"$group": {
+                "_id": {"contractorId": "$contractorId", "period": "$period", "type": "$type"},
+                "amount": {"$sum": "$amount"},
+                "count": {"$sum": 1}
+            }}
+        ]).to_list(None)
+
+        now = datetime.utcnow()
+        totals = {cid: {"earned": 0.0, "pending": 0.0} for cid in contractor_ids}
+        months = {}
+        for g in groups:
+            cid = g["_id"]["contractorId"]
+            period = g["_id"]["period"]
+            if g["_id"]["type"] == LEDGER_ACCEPTED:
+                totals[cid]["pending"] += g["amount"]
+            elif g["_id"]["type"] == LEDGER_COMPLETED:
+                totals[cid]["pending"] -= g["amount"]
+                totals[cid]["earned"] += g["amount"]
+                month = months.setdefault((cid, period), {"earned": 0.0, "jobs": 0})
+                month["earned"] += g["amount"]
+                month["jobs"] += g["count"]
+
+        ops = [
+            ReplaceOne(
+                {"contractorId": cid, "period": TOTAL_PERIOD},
+                {"contractorId": cid, "period": TOTAL_PERIOD, **t, "updatedAt": now},
+                upsert=True
+            )
+            for cid, t in totals.items()
+        ]
+        ops += [
+            ReplaceOne(
+                {"contractorId": cid, "period": period},
+                {"contractorId": cid, "period": period, **m, "updatedAt": now},
+                upsert=True
+            )
+            for (cid, period), m in months.items()
+        ]
+        # Drop months that no longer have ledger entries
+        for cid in contractor_ids:
+            periods = [TOTAL_PERIOD] + [p for (c, p) in months if c == cid]
+            ops.append(DeleteMany({"contractorId": cid, "period": {"$nin": periods}}))
+
+        await db.earnings_rollups.bulk_write(ops, ordered=False)
+
+        rebuilt += len(contractor_ids)
+        print(f"🔁 Rebuilt earnings rollups for {rebuilt} contractors")
+
+    return rebuilt
@@ -0,0 +1,44 @@
+from typing import Optional
+from fastapi import Request, Response
+import hashlib
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag from any printable parts"""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match already names this ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: ignore W/ prefixes on either side
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+
+async def fingerprint(collection, query: dict, session=None) -> tuple:
+    """
+    (newest updatedAt, count) for the documents matching query.
+    With an index on the query fields followed by updatedAt both reads are
+    covered - no documents are fetched.
+    """
+    newest = await collection.find(
+        query, {"_id": 0, "updatedAt": 1}, session=session
+    ).sort("updatedAt", -1).limit(1).to_list(1)
+    count = await collection.count_documents(query, session=session)
+    newest_at: Optional[object] = newest[0].get("updatedAt") if newest else None
+    return newest_at, count
@@ -0,0 +1,117 @@
+from typing import Dict, List
+import os
+
+from utils.cache import TTLCache
+from utils.invalidation import invalidation_bus
+
+# ────────────────────────────────────────────────
+# Browse facets
+#
+# Filter sidebars need counts per skill and per rating/rate/budget bucket.
+# Each facet set is one aggregation - a $match on the current filters, then
+# a $facet with one sub-pipeline per facet - cached for FACET_CACHE_TTL
+# seconds under the normalized filters, so equivalent filter sets (skill
+# order, duplicates, unset values) share an entry. Changes to the counted
+# collection drop that kind's entries on every worker.
+# ────────────────────────────────────────────────
+
+FACET_CACHE_TTL = float(os.getenv("FACET_CACHE_TTL", "30"))
+FACET_SKILL_LIMIT = 30
+
+RATING_BOUNDARIES = [0, 1, 2, 3, 4, 4.5]
+HOURLY_RATE_BOUNDARIES = [0, 25, 50, 75, 100, 150]
+BUDGET_BOUNDARIES = [0, 500, 1000, 5000, 10000, 50000]
+OUT_OF_RANGE_BUCKET = "out_of_range"
+
+facet_cache = TTLCache(ttl=FACET_CACHE_TTL, max_entries=2000)
+
+# Facet kind counted over each watched collection
+FACET_KINDS = {"users": "contractors", "projects": "projects"}
+# Fields each kind filters or counts on; updates touching none of them (e.g.
+# progress flushes, profile views) leave cached counts alone
+FACET_FIELDS = {
+    "users": {"role", "status", "skills", "rating", "hourlyRate"},
+    "projects": {"status", "skillsRequired", "budget", "title", "description"},
+}
+
+
+def _invalidate_facets(event: dict):
+    if event["type"] == "reset":
+        facet_cache.clear()
+    elif event["collection"] == "users" and event["document"].get("role") not in (None, "contractor"):
+        # Client and admin accounts aren't counted
+        return
+    elif event["type"] == "update" and not {f.split(".")[0] for f in event["fields"]} & FACET_FIELDS[event["collection"]]:
+        return
+    else:
+        kind = FACET_KINDS[event["collection"]]
+        facet_cache.invalidate_where(lambda key, value: key[0] == kind)
+
+
+invalidation_bus.subscribe(list(FACET_KINDS), _invalidate_facets)
+
+
+def normalize_filters(**filters) -> tuple:
+    """Hashable, order-independent form of a filter set"""
+    normalized = []
+    for name, value in sorted(filters.items()):
+        if value is None or value == []:
+            continue
+        if isinstance(value, list):
+            value = tuple(sorted(set(value)))
+        normalized.append((name, value))
+    return tuple(normalized)
+
+
+def skill_facet(field: str) -> list:
+    return [
+        {"$unwind": f"${field}"},
+        {"$sortByCount": f"${field}"},
+        {"$limit": FACET_SKILL_LIMIT}
+    ]
+
+
+def bucket_facet(field: str, boundaries: List[float]) -> list:
+    """Counts per [boundary, next boundary); the last bucket is open-ended"""
+    return [
+        {"$match": {field: {"$type": "number"}}},
+        {"$bucket": {
+            "groupBy": f"${field}",
+            "boundaries": boundaries + [float("inf")],
+            # Below the first boundary (bad data) - not reported
+            "default": OUT_OF_RANGE_BUCKET
+        }}
+    ]
+
+
+def _buckets(rows: List[dict], boundaries: List[float]) -> List[dict]:
+    counts = {row["_id"]: row["count"] for row in rows}
+    edges = boundaries + [None]
+    return [
+        {"min": low, "max": high, "count": counts.get(low, 0)}
+        for low, high in zip(edges, edges[1:])
+    ]
+
+
+async def facet_counts(collection, match: dict, skill_field: str, buckets: Dict[str, List[float]]) -> dict:
+    """One round trip: total, top skills and every requested bucket facet"""
+    facets = {"total": [{"$count": "n"}], "skills": skill_facet(skill_field)}
+    for field, boundaries in buckets.items():
+        facets[field] = bucket_facet(field, boundaries)
+
+    result = (await collection.aggregate([{"$match": match}, {"$facet": facets}]).to_list(1))[0]
+    return {
+        "total": result["total"][0]["n"] if result["total"] else 0,
+        "skills": [{"skill": row["_id"], "count": row["count"]} for row in result["skills"]],
+        **{field: _buckets(result[field], boundaries) for field, boundaries in buckets.items()}
+    }
+
+
+async def cached_facet_counts(kind: str, filters: tuple, collection, match: dict,
+                              skill_field: str, buckets: Dict[str, List[float]]) -> dict:
+    key = (kind, filters)
+    cached = facet_cache.get(key)
+    if cached is None:
+        cached = await facet_counts(collection, match, skill_field, buckets)
+        facet_cache.set(key, cached)
+    return cached
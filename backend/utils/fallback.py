@@ -0,0 +1,56 @@
+from pymongo.errors import PyMongoError
+from typing import Callable, List, Optional
+import functools
+import os
+
+import database
+from database import DatabaseUnavailable
+from utils.cache import TTLCache
+from utils.singleflight import call_key, forget_calls
+
+# How long a read endpoint's last good result may be served while Mongo is down
+STALE_RESULT_TTL = float(os.getenv("STALE_RESULT_TTL", "600"))
+
+
+def stale_fallback(ttl: float = STALE_RESULT_TTL, invalidate_on: Optional[List[str]] = None,
+                   scope: Optional[Callable[[dict], Optional[dict]]] = None):
+    """
+    Route decorator serving the last good result for the same arguments
+    when the database circuit is open or the query fails. With nothing
+    cached the error propagates (503 for an open circuit). Results known to
+    be outdated - invalidate_on/scope as for single_flight - are dropped.
+
+    Place below @single_flight so coalesced callers share the fallback:
+        @router.get("/contractors")
+        @single_flight(ttl=2)
+        @stale_fallback()
+        async def browse_contractors(...):
+    """
+    def decorator(func):
+        last_good = TTLCache(ttl=ttl, max_entries=5000)
+        if invalidate_on:
+            forget_calls(last_good, invalidate_on, scope)
+
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            key = call_key(kwargs)
+            if database.breaker.allow():
+                try:
+                    result = await func(**kwargs)
+                except PyMongoError:
+                    stale = last_good.get(key)
+                    if stale is None:
+                        raise
+                    return stale
+                last_good.set(key, result)
+                return result
+
+            stale = last_good.get(key)
+            if stale is None:
+                raise DatabaseUnavailable(database.breaker.retry_after())
+            return stale
+
+        # DeadlineRoute leaves the circuit check to this wrapper
+        wrapper.serves_stale = True
+        return wrapper
+    return decorator
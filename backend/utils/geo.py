@@ -0,0 +1,110 @@
+from typing import List, Optional, Tuple
+from bson import ObjectId
+
+# ────────────────────────────────────────────────
+# Geospatial project discovery
+#
+# projects.location  GeoJSON point {type: "Point", coordinates: [lng, lat]}
+# users.serviceArea  {center: <GeoJSON point>, radiusKm} on contractors
+#
+# Discovery runs $geoNear over a compound (status, location 2dsphere,
+# budget) index: status and budget filter inside the index walk, which
+# yields projects nearest first and stops at the radius. Pages continue
+# from the last distance (minDistance), not by skipping, so deep pages cost
+# the same as the first.
+# ────────────────────────────────────────────────
+
+PROJECT_GEO_INDEX = [("status", 1), ("location", "2dsphere"), ("budget", 1)]
+DEFAULT_RADIUS_KM = 25
+MAX_RADIUS_KM = 500
+
+
+def point(longitude: float, latitude: float) -> dict:
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+
+def lat_lng(geo: Optional[dict]) -> Optional[dict]:
+    """GeoJSON point -> {"latitude", "longitude"} for API responses"""
+    if not geo or geo.get("type") != "Point":
+        return None
+    longitude, latitude = geo["coordinates"]
+    return {"latitude": latitude, "longitude": longitude}
+
+
+def parse_location(text: str) -> dict:
+    """'<lat>,<lng>' -> GeoJSON point; raises ValueError if malformed or out of range"""
+    latitude, longitude = (float(part) for part in text.split(","))
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("coordinates out of range")
+    return point(longitude, latitude)
+
+
+def encode_cursor(distance: float, ids: List[ObjectId]) -> str:
+    return f"{distance!r}|{','.join(str(i) for i in ids)}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, List[ObjectId]]:
+    """Raises ValueError if malformed"""
+    distance, ids = cursor.split("|")
+    ids = [i for i in ids.split(",") if i]
+    if not all(ObjectId.is_valid(i) for i in ids):
+        raise ValueError("invalid project id in cursor")
+    return float(distance), [ObjectId(i) for i in ids]
+
+
+async def projects_near(
+    db,
+    center: dict,
+    radius_km: float,
+    skills: Optional[List[str]] = None,
+    min_budget: Optional[float] = None,
+    max_budget: Optional[float] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """Open projects within radius_km of center, nearest first; returns (page, next_cursor)"""
+    query = {"status": "open"}
+    if skills:
+        query["skillsRequired"] = {"$in": skills}
+    if min_budget is not None or max_budget is not None:
+        query["budget"] = {}
+        if min_budget is not None:
+            query["budget"]["$gte"] = min_budget
+        if max_budget is not None:
+            query["budget"]["$lte"] = max_budget
+
+    geo_near = {
+        "near": center,
+        "key": "location",
+        "distanceField": "distance",
+        "maxDistance": radius_km * 1000,
+        "spherical": True,
+        "query": query
+    }
+    if cursor:
+        # Resume at the previous page's last distance, minus the ties already returned
+        min_distance, seen = decode_cursor(cursor)
+        geo_near["minDistance"] = min_distance
+        query["_id"] = {"$nin": seen}
+
+    projects = await db.projects.aggregate([
+        {"$geoNear": geo_near},
+        {"$limit": limit},
+        {"$project": {
+            "title": 1,
+            "budget": 1,
+            "skillsRequired": 1,
+            "postedDate": 1,
+            "location": 1,
+            "distance": 1
+        }}
+    ]).to_list(limit)
+
+    next_cursor = None
+    if len(projects) == limit:
+        last = projects[-1]["distance"]
+        ties = [p["_id"] for p in projects if p["distance"] == last]
+        if cursor and last == min_distance:
+            ties += seen
+        next_cursor = encode_cursor(last, ties)
+    return projects, next_cursor
@@ -0,0 +1,151 @@
+from datetime import datetime
+from typing import Callable, Dict, List
+from pymongo.errors import OperationFailure, PyMongoError
+import asyncio
+import os
+
+# ────────────────────────────────────────────────
+# Cache invalidation bus
+#
+# Every worker tails one change stream over WATCHED_COLLECTIONS and hands
+# each change to the handlers subscribed to that collection. Events are
+# dicts:
+#   {"type": "insert" | "update" | "replace" | "delete" | "reset",
+#    "collection": "projects", "id": <_id>, "fields": [updated field names],
+#    "document": {<owner id fields of the post-image, {} for deletes>}}
+# "reset" (collection None) means changes may have been missed - the
+# stream restarted without its resume token - so handlers should drop
+# everything they hold.
+#
+# The resume token is saved to stream_tokens every
+# INVALIDATION_TOKEN_SAVE_SECONDS, so a restarted worker picks up where the
+# fleet left off. Change streams need a replica set; on a standalone server
+# the bus logs once and caches fall back to their TTLs.
+# ────────────────────────────────────────────────
+
+WATCHED_COLLECTIONS = ["users", "projects", "proposals", "messages"]
+INVALIDATION_STREAM_NAME = os.getenv("INVALIDATION_STREAM_NAME", "cache_invalidation")
+INVALIDATION_TOKEN_SAVE_SECONDS = float(os.getenv("INVALIDATION_TOKEN_SAVE_SECONDS", "5"))
+INVALIDATION_RETRY_SECONDS = 5
+
+# Owner ids (plus status and project skills) handlers key their caches on; only these leave the server
+DOCUMENT_FIELDS = ["role", "status", "skillsRequired", "clientId", "projectId", "contractorId", "senderId", "recipientId"]
+
+# Server codes for a resume token that is no longer usable
+HISTORY_LOST_CODES = {260, 280, 286}
+# Change streams are not supported (standalone server)
+UNSUPPORTED_CODES = {40573}
+
+
+class InvalidationBus:
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable]] = {}
+
+    def subscribe(self, collections: List[str], handler: Callable[[dict], None]):
+        """Call handler(event) for changes to these collections (and for resets)"""
+        for name in collections:
+            self._handlers.setdefault(name, []).append(handler)
+
+    def publish(self, event: dict):
+        if event["type"] == "reset":
+            handlers = {h for hs in self._handlers.values() for h in hs}
+        else:
+            handlers = self._handlers.get(event["collection"], [])
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                print(f"❌ Invalidation handler {handler.__name__} failed: {e}")
+
+
+invalidation_bus = InvalidationBus()
+
+
+def _pipeline() -> list:
+    return [
+        {"$match": {
+            "ns.coll": {"$in": WATCHED_COLLECTIONS},
+            "operationType": {"$in": ["insert", "update", "replace", "delete"]}
+        }},
+        {"$project": {
+            "ns": 1,
+            "operationType": 1,
+            "documentKey": 1,
+            "updateDescription.updatedFields": 1,
+            "updateDescription.removedFields": 1,
+            **{f"fullDocument.{field}": 1 for field in DOCUMENT_FIELDS}
+        }}
+    ]
+
+
+def _event(change: dict) -> dict:
+    update = change.get("updateDescription") or {}
+    fields = list(update.get("updatedFields", {})) + list(update.get("removedFields", []))
+    return {
+        "type": change["operationType"],
+        "collection": change["ns"]["coll"],
+        "id": change["documentKey"]["_id"],
+        "fields": fields,
+        "document": change.get("fullDocument") or {}
+    }
+
+
+async def _load_token(db):
+    saved = await db.stream_tokens.find_one({"_id": INVALIDATION_STREAM_NAME})
+    return saved["token"] if saved else None
+
+
+async def _save_token(db, token):
+    await db.stream_tokens.update_one(
+        {"_id": INVALIDATION_STREAM_NAME},
+        {"$set": {"token": token, "updatedAt": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+async def _tail(db, bus: InvalidationBus, state: dict) -> None:
+    """Publish changes until the stream fails, keeping state["token"] current"""
+    loop = asyncio.get_running_loop()
+    saved_at = loop.time()
+    async with db.watch(
+        _pipeline(), full_document="updateLookup", resume_after=state["token"]
+    ) as stream:
+        # Without a token, changes made before the stream opened are unknown
+        if state["token"] is None:
+            bus.publish({"type": "reset", "collection": None, "id": None, "fields": [], "document": {}})
+        while stream.alive:
+            change = await stream.try_next()
+            if change is not None:
+                bus.publish(_event(change))
+            if stream.resume_token is not None:
+                state["token"] = stream.resume_token
+            if state["token"] is not None and loop.time() - saved_at >= INVALIDATION_TOKEN_SAVE_SECONDS:
+                await _save_token(db, state["token"])
+                saved_at = loop.time()
+
+
+async def run_invalidation_stream(get_db, bus: InvalidationBus = invalidation_bus):
+    """Background loop started from main.startup_event"""
+    state = None
+    while True:
+        try:
+            db = get_db()
+            if state is None:
+                state = {"token": await _load_token(db)}
+            await _tail(db, bus, state)
+        except asyncio.CancelledError:
+            raise
+        except OperationFailure as e:
+            if e.code in UNSUPPORTED_CODES:
+                print("⚠️ Change streams unavailable (not a replica set); caches rely on their TTLs")
+                return
+            if e.code in HISTORY_LOST_CODES:
+                print("⚠️ Invalidation resume token expired; starting a fresh stream")
+                await db.stream_tokens.delete_one({"_id": INVALIDATION_STREAM_NAME})
+                state["token"] = None
+            else:
+                print(f"❌ Invalidation stream failed: {e}")
+        except PyMongoError as e:
+            # Resumes from the last token seen, so nothing is missed
+            print(f"❌ Invalidation stream failed: {e}")
+        await asyncio.sleep(INVALIDATION_RETRY_SECONDS)
@@ -0,0 +1,243 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument
+import asyncio
+import os
+from utils.bson_compat import id_match, ids_match
+
+# ────────────────────────────────────────────────
+# Admin background jobs
+#
+# jobs  {_id, type, userId, status: queued|running|completed|failed,
+#        step, progress: {<step>: <docs touched>}, leaseUntil, attempts,
+#        runAfter, error}
+#
+# Work is done in bounded batches with a pause between them. Each batch
+# re-queries what is left and records progress, so a job whose worker dies
+# is picked up again once its lease expires and resumes at its last step.
+# A step that raises is retried with exponential backoff; after
+# JOB_MAX_ATTEMPTS the job is failed until an admin re-queues it.
+# ────────────────────────────────────────────────
+
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", "1000"))
+JOB_THROTTLE_SECONDS = float(os.getenv("JOB_THROTTLE_SECONDS", "0.05"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+JOB_RETRY_MAX_SECONDS = 3600
+
+
+async def enqueue(db, job_type: str, user_id: str, requested_by: str) -> str:
+    """Queue a job and return its id"""
+    now = datetime.utcnow()
+    result = await db.jobs.insert_one({
+        "type": job_type,
+        "userId": user_id,
+        "requestedBy": requested_by,
+        "status": "queued",
+        "step": 0,
+        "progress": {},
+        "createdAt": now,
+        "updatedAt": now
+    })
+    return str(result.inserted_id)
+
+
+def job_summary(job: dict) -> dict:
+    return {
+        "id": str(job["_id"]),
+        "type": job["type"],
+        "user_id": job["userId"],
+        "status": job["status"],
+        "attempts": job.get("attempts", 0),
+        "progress": job.get("progress", {}),
+        "error": job.get("error"),
+        "created_at": job["createdAt"].isoformat(),
+        "updated_at": job["updatedAt"].isoformat()
+    }
+
+
+async def _checkpoint(db, job: dict, step_name: str, count: int):
+    """Record batch progress and extend the lease"""
+    now = datetime.utcnow()
+    await db.jobs.update_one(
+        {"_id": job["_id"]},
+        {
+            "$inc": {f"progress.{step_name}": count},
+            "$set": {"leaseUntil": now + timedelta(seconds=JOB_LEASE_SECONDS), "updatedAt": now}
+        }
+    )
+
+
+async def _delete_in_batches(db, job: dict, step_name: str, collection, query: dict):
+    while True:
+        batch = await collection.find(query, {"_id": 1}).limit(JOB_BATCH_SIZE).to_list(JOB_BATCH_SIZE)
+        if not batch:
+            return
+        result = await collection.delete_many({"_id": {"$in": [d["_id"] for d in batch]}})
+        await _checkpoint(db, job, step_name, result.deleted_count)
+        await asyncio.sleep(JOB_THROTTLE_SECONDS)
+
+
+async def _update_in_batches(db, job: dict, step_name: str, collection, query: dict, update: dict):
+    # The update must take documents out of `query`, otherwise this never ends
+    while True:
+        batch = await collection.find(query, {"_id": 1}).limit(JOB_BATCH_SIZE).to_list(JOB_BATCH_SIZE)
+        if not batch:
+            return
+        result = await collection.update_many({"_id": {"$in": [d["_id"] for d in batch]}}, update)
+        await _checkpoint(db, job, step_name, result.modified_count)
+        await asyncio.sleep(JOB_THROTTLE_SECONDS)
+
+
+# ── delete_user ──────────────────────────────────
+
+async def _delete_client_projects(db, job):
+    user_id = job["userId"]
+    while True:
+        projects = await db.projects.find({"clientId": id_match(user_id)}, {"_id": 1}).limit(JOB_BATCH_SIZE).to_list(JOB_BATCH_SIZE)
+        if not projects:
+            return
+        project_ids = [p["_id"] for p in projects]
+        # Proposals first, so a crash never leaves orphans behind deleted projects
+        await _delete_in_batches(
+            db, job, "project_proposals", db.proposals,
+            {"projectId": ids_match(project_ids)}
+        )
+        result = await db.projects.delete_many({"_id": {"$in": project_ids}})
+        await _checkpoint(db, job, "projects", result.deleted_count)
+        await asyncio.sleep(JOB_THROTTLE_SECONDS)
+
+
+async def _delete_contractor_proposals(db, job):
+    await _delete_in_batches(db, job, "proposals", db.proposals, {"contractorId": id_match(job["userId"])})
+
+
+async def _delete_sent_messages(db, job):
+    await _delete_in_batches(db, job, "messages_sent", db.messages, {"senderId": id_match(job["userId"])})
+
+
+async def _delete_received_messages(db, job):
+    await _delete_in_batches(db, job, "messages_received", db.messages, {"recipientId": id_match(job["userId"])})
+
+
+async def _delete_archived_messages(db, job):
+    user_id = job["userId"]
+    await _delete_in_batches(db, job, "archive_sent", db.messages_archive, {"senderId": id_match(user_id)})
+    await _delete_in_batches(db, job, "archive_received", db.messages_archive, {"recipientId": id_match(user_id)})
+
+
+async def _delete_message_buckets(db, job):
+    await _delete_in_batches(db, job, "message_buckets", db.message_buckets, {"participants": job["userId"]})
+
+
+async def _delete_user_state(db, job):
+    # Earnings ledger entries are kept as the financial record
+    user_id = job["userId"]
+    await db.activity_feeds.delete_one({"_id": user_id})
+    await db.earnings_rollups.delete_many({"contractorId": user_id})
+    result = await db.users.delete_one({"_id": ObjectId(user_id)})
+    await _checkpoint(db, job, "users", result.deleted_count)
+
+
+# ── suspend_user ─────────────────────────────────
+
+async def _hold_open_projects(db, job):
+    await _update_in_batches(
+        db, job, "projects_on_hold", db.projects,
+        {"clientId": id_match(job["userId"]), "status": "open"},
+        {"$set": {"status": "on_hold", "updatedAt": datetime.utcnow()}}
+    )
+
+
+async def _withdraw_pending_proposals(db, job):
+    await _update_in_batches(
+        db, job, "proposals_withdrawn", db.proposals,
+        {"contractorId": id_match(job["userId"]), "status": "pending"},
+        {"$set": {"status": "withdrawn", "updatedAt": datetime.utcnow()}}
+    )
+
+
+JOB_STEPS = {
+    "delete_user": [
+        _delete_client_projects,
+        _delete_contractor_proposals,
+        _delete_sent_messages,
+        _delete_received_messages,
+        _delete_archived_messages,
+        _delete_message_buckets,
+        _delete_user_state,
+    ],
+    "suspend_user": [
+        _hold_open_projects,
+        _withdraw_pending_proposals,
+    ],
+}
+
+
+async def _claim(db):
+    """Take the oldest queued job, or a running one whose lease has expired"""
+    now = datetime.utcnow()
+    return await db.jobs.find_one_and_update(
+        {"$or": [
+            {"status": "queued", "$or": [{"runAfter": {"$exists": False}}, {"runAfter": {"$lte": now}}]},
+            {"status": "running", "leaseUntil": {"$lt": now}}
+        ]},
+        {"$set": {
+            "status": "running",
+            "leaseUntil": now + timedelta(seconds=JOB_LEASE_SECONDS),
+            "updatedAt": now
+        }},
+        sort=[("createdAt", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def run_job(db, job: dict):
+    steps = JOB_STEPS[job["type"]]
+    try:
+        for index in range(job.get("step", 0), len(steps)):
+            await steps[index](db, job)
+            await db.jobs.update_one({"_id": job["_id"]}, {"$set": {"step": index + 1}})
+        await db.jobs.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"status": "completed", "updatedAt": datetime.utcnow()}, "$unset": {"leaseUntil": ""}}
+        )
+    except Exception as e:
+        attempts = job.get("attempts", 0) + 1
+        now = datetime.utcnow()
+        if attempts < JOB_MAX_ATTEMPTS:
+            delay = min(JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), JOB_RETRY_MAX_SECONDS)
+            print(f"⚠️ Job {job['_id']} ({job['type']}) attempt {attempts} failed, retrying in {delay:.0f}s: {e}")
+            update = {"status": "queued", "runAfter": now + timedelta(seconds=delay)}
+        else:
+            print(f"❌ Job {job['_id']} ({job['type']}) failed after {attempts} attempts: {e}")
+            update = {"status": "failed"}
+        await db.jobs.update_one(
+            {"_id": job["_id"]},
+            {"$set": {**update, "attempts": attempts, "error": str(e), "updatedAt": now}, "$unset": {"leaseUntil": ""}}
+        )
+
+
+async def requeue(db, job_id: ObjectId) -> bool:
+    """Put a failed job back in the queue with fresh attempts; it resumes at its last step"""
+    result = await db.jobs.update_one(
+        {"_id": job_id, "status": "failed"},
+        {"$set": {"status": "queued", "attempts": 0, "updatedAt": datetime.utcnow()}, "$unset": {"runAfter": "", "error": ""}}
+    )
+    return result.modified_count == 1
+
+
+async def run_worker(get_db, poll_interval: float = JOB_POLL_INTERVAL):
+    """Background loop started from main.startup_event"""
+    while True:
+        try:
+            db = get_db()
+            job = await _claim(db)
+            if job:
+                await run_job(db, job)
+                continue
+        except Exception as e:
+            print(f"❌ Job worker error: {e}")
+        await asyncio.sleep(poll_interval)
@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+
+
+async def acquire_lease(db, name: str, seconds: float) -> bool:
+    """
+    Cluster-wide lease so periodic jobs run on one worker at a time.
+    Returns True if this process now holds `name` for `seconds`.
+    """
+    now = datetime.utcnow()
+    try:
+        await db.leases.find_one_and_update(
+            {"_id": name, "$or": [{"until": {"$lt": now}}, {"until": {"$exists": False}}]},
+            {"$set": {"until": now + timedelta(seconds=seconds)}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        # Someone else holds an unexpired lease
+        return False
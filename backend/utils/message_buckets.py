@@ -0,0 +1,154 @@
+from typing import List
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+import os
+from utils.bson_compat import id_match
+
+# ────────────────────────────────────────────────
+# Bucketed conversation storage (optional)
+#
+# message_buckets  {pair: "<low id>|<high id>", participants, origin,
+#                   count, minId, maxId, messages: [...]}
+#
+# With MESSAGE_BUCKET_WRITES, send_message also appends each message to the
+# open bucket for its participant pair. With MESSAGE_BUCKET_READS,
+# conversation reads fetch the newest one or two buckets instead of up to
+# 100 flat documents. The flat `messages` collection stays authoritative
+# for inbox listing, unread counts and retention.
+#
+# Rollout: enable writes, run scripts/migrate_message_buckets.py to copy
+# older history, then enable reads.
+#
+# `origin` keeps live appends and migrated history in separate buckets so
+# their id ranges never interleave; reads order buckets by maxId. A unique
+# partial index allows one open bucket per pair and origin, so concurrent
+# senders that both overflow a bucket agree on its successor.
+# ────────────────────────────────────────────────
+
+MESSAGE_BUCKET_WRITES = os.getenv("MESSAGE_BUCKET_WRITES", "false").lower() == "true"
+MESSAGE_BUCKET_READS = os.getenv("MESSAGE_BUCKET_READS", "false").lower() == "true"
+MESSAGE_BUCKET_SIZE = int(os.getenv("MESSAGE_BUCKET_SIZE", "100"))
+
+ORIGIN_LIVE = "live"
+ORIGIN_MIGRATION = "migration"
+
+
+def pair_key(user_a, user_b) -> str:
+    """Order-independent conversation key (ids may be strings or ObjectIds)"""
+    low, high = sorted([str(user_a), str(user_b)])
+    return f"{low}|{high}"
+
+
+async def append_messages(db, messages: List[dict], origin: str = ORIGIN_LIVE):
+    """
+    Append messages (all from the same pair, ascending _id) to the pair's
+    open bucket, closing it and starting a new one when it would overflow.
+    """
+    if not messages:
+        return
+    first = messages[0]
+    pair = pair_key(first["senderId"], first["recipientId"])
+    ids = [m["_id"] for m in messages]
+    update = {
+        "$push": {"messages": {"$each": messages}},
+        "$inc": {"count": len(messages)},
+        "$min": {"minId": min(ids)},
+        "$max": {"maxId": max(ids)}
+    }
+
+    while True:
+        result = await db.message_buckets.update_one(
+            {"pair": pair, "origin": origin, "open": True, "count": {"$lte": MESSAGE_BUCKET_SIZE - len(messages)}},
+            update
+        )
+        if result.matched_count:
+            return
+
+        # Close the bucket only if it is still too full - not one a
+        # concurrent sender has just opened
+        await db.message_buckets.update_many(
+            {"pair": pair, "origin": origin, "open": True, "count": {"$gt": MESSAGE_BUCKET_SIZE - len(messages)}},
+            {"$set": {"open": False}}
+        )
+        try:
+            await db.message_buckets.insert_one({
+                "pair": pair,
+                "participants": sorted([str(first["senderId"]), str(first["recipientId"])]),
+                "origin": origin,
+                "open": True,
+                "count": len(messages),
+                "minId": min(ids),
+                "maxId": max(ids),
+                "messages": messages
+            })
+            return
+        except DuplicateKeyError:
+            # Another sender opened the next bucket first; append to it
+            continue
+
+
+async def latest_conversation(db, user_a: str, user_b: str, limit: int = 100) -> List[dict]:
+    """Newest `limit` messages of a conversation, newest first"""
+    buckets_needed = -(-limit // MESSAGE_BUCKET_SIZE) + 1
+    cursor = db.message_buckets.find(
+        {"pair": pair_key(user_a, user_b)}
+    ).sort("maxId", -1).batch_size(buckets_needed)
+
+    seen = set()
+    messages = []
+    async for bucket in cursor:
+        # Buckets can be sparse (closed early, or migration repeats), so keep
+        # reading until older buckets cannot hold anything newer than the
+        # `limit` messages collected so far
+        if len(messages) >= limit:
+            messages.sort(key=lambda m: m["_id"], reverse=True)
+            if bucket["maxId"] < messages[limit - 1]["_id"]:
+                break
+        for m in bucket["messages"]:
+            # A migration batch interrupted before it was marked can repeat
+            if m["_id"] not in seen:
+                seen.add(m["_id"])
+                messages.append(m)
+    messages.sort(key=lambda m: m["_id"], reverse=True)
+    return messages[:limit]
+
+
+async def mark_read(db, recipient_id: str, sender_id: str):
+    """Mirror a mark-conversation-read into the pair's buckets"""
+    await db.message_buckets.update_many(
+        {"pair": pair_key(recipient_id, sender_id), "messages": {"$elemMatch": {"recipientId": id_match(recipient_id), "read": False}}},
+        {"$set": {"messages.$[m].read": True}},
+        array_filters=[{"m.recipientId": id_match(recipient_id), "m.read": False}]
+    )
+
+
+async def migrate_flat_messages(db, batch_size: int = 1000) -> int:
+    """
+    Copy flat messages that are not yet bucketed into migration buckets,
+    oldest first, marking each batch once copied. Safe to stop and re-run;
+    returns the number of messages migrated.
+    """
+    migrated = 0
+    last_id = ObjectId("0" * 24)
+    while True:
+        batch = await db.messages.find(
+            {"_id": {"$gt": last_id}, "bucketed": {"$ne": True}}
+        ).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            return migrated
+        last_id = batch[-1]["_id"]
+
+        by_pair = {}
+        for m in batch:
+            m.pop("bucketed", None)
+            by_pair.setdefault(pair_key(m["senderId"], m["recipientId"]), []).append(m)
+        for pair_messages in by_pair.values():
+            for start in range(0, len(pair_messages), MESSAGE_BUCKET_SIZE):
+                await append_messages(db, pair_messages[start:start + MESSAGE_BUCKET_SIZE], ORIGIN_MIGRATION)
+
+        await db.messages.update_many(
+            {"_id": {"$in": [m["_id"] for m in batch]}},
+            {"$set": {"bucketed": True}}
+        )
+        migrated += len(batch)
+        print(f"🪣 Migrated {migrated} messages into buckets")
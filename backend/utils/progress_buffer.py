@@ -0,0 +1,96 @@
+from datetime import datetime
+from typing import Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+import asyncio
+import os
+
+# ────────────────────────────────────────────────
+# Project progress write-batching
+#
+# PROGRESS_DURABILITY:
+#   "buffered" - keep only the latest update per project in memory and
+#                flush every PROGRESS_FLUSH_INTERVAL seconds (and on shutdown)
+#   "sync"     - write each update straight through
+# ────────────────────────────────────────────────
+
+PROGRESS_DURABILITY = os.getenv("PROGRESS_DURABILITY", "buffered")
+PROGRESS_FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "2"))
+
+
+def _update_op(project_id: str, entry: dict) -> UpdateOne:
+    return UpdateOne(
+        {"_id": ObjectId(project_id)},
+        {"$set": {
+            "progress": entry["progress"],
+            "progressNotes": entry["notes"],
+            "progressUpdatedAt": entry["at"],
+            "updatedAt": entry["at"]
+        }}
+    )
+
+
+class ProgressBuffer:
+    """Coalesces progress pings per project into periodic bulk writes"""
+
+    def __init__(self, durability: str = PROGRESS_DURABILITY, interval: float = PROGRESS_FLUSH_INTERVAL):
+        self.durability = durability
+        self.interval = interval
+        self._pending = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def record(self, db, project_id: str, progress: int, notes: Optional[str]):
+        entry = {"progress": progress, "notes": notes, "at": datetime.utcnow()}
+        if self.durability == "sync":
+            await db.projects.bulk_write([_update_op(project_id, entry)])
+            return
+        # Later pings simply overwrite earlier ones for the same project
+        self._pending[project_id] = entry
+
+    async def flush(self, db) -> int:
+        """Write every buffered update in one bulk_write; returns the count"""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        try:
+            await db.projects.bulk_write(
+                [_update_op(pid, entry) for pid, entry in batch.items()],
+                ordered=False
+            )
+        except BaseException:
+            # Including cancellation at shutdown: put back anything that
+            # hasn't been superseded meanwhile, for the final flush
+            for pid, entry in batch.items():
+                self._pending.setdefault(pid, entry)
+            raise
+        return len(batch)
+
+    async def _run(self, get_db):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush(get_db())
+            except Exception as e:
+                print(f"❌ Progress flush failed: {e}")
+
+    def start(self, get_db):
+        """Start the periodic flusher (no-op in sync mode)"""
+        if self.durability == "buffered" and self._task is None:
+            self._task = asyncio.create_task(self._run(get_db))
+
+    async def stop(self, db):
+        """Stop the flusher and write whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            # Let an in-progress flush re-queue its batch before the final one
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        flushed = await self.flush(db)
+        if flushed:
+            print(f"✅ Flushed {flushed} buffered progress updates")
+
+
+progress_buffer = ProgressBuffer()
@@ -0,0 +1,194 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+import json
+import os
+import time
+
+import database
+
+# ────────────────────────────────────────────────
+# Token-bucket rate limiting
+#
+# RATE_LIMITS configures buckets per path prefix as "<prefix>=<rate>/<burst>"
+# pairs, e.g. "auth/login=0.2/5,client=20/40" (rate in requests per second).
+# The longest matching prefix wins and buckets are keyed by prefix + client
+# IP. Login additionally limits per email before any bcrypt work.
+#
+# RATE_LIMIT_BACKEND picks where buckets live:
+#   "memory" - per process (default, no I/O on the request path)
+#   "mongo"  - shared across workers via the rate_limits collection
+# ────────────────────────────────────────────────
+
+DEFAULT_RATE_LIMITS = "auth/login=0.2/5,auth=1/10,client=20/40,contractor=20/40,admin=10/20"
+RATE_LIMITS = os.getenv("RATE_LIMITS", DEFAULT_RATE_LIMITS)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+LOGIN_EMAIL_RATE = os.getenv("LOGIN_EMAIL_RATE", "0.05/5")
+
+
+def parse_limit(spec: str) -> Tuple[float, float]:
+    rate, burst = spec.split("/")
+    return float(rate), float(burst)
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """'auth=1/10,client=20/40' -> {'/auth': (1.0, 10.0), '/client': (20.0, 40.0)}"""
+    limits = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        prefix, limit = part.split("=")
+        limits["/" + prefix.strip("/")] = parse_limit(limit)
+    return limits
+
+
+class InMemoryTokenBuckets:
+    """Per-process buckets; the least recently used are evicted past max_keys"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        """Spend one token; returns 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [burst, now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate
+
+
+class MongoTokenBuckets:
+    """
+    Buckets shared by every worker. Refill and spend happen in one
+    pipeline update, so concurrent requests can't overspend a bucket.
+    """
+
+    def __init__(self, get_db):
+        self.get_db = get_db
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        now = datetime.utcnow()
+        refilled = {"$min": [
+            burst,
+            {"$add": [
+                {"$ifNull": ["$tokens", burst]},
+                {"$multiply": [
+                    {"$divide": [{"$subtract": [now, {"$ifNull": ["$at", now]}]}, 1000]},
+                    rate
+                ]}
+            ]}
+        ]}
+        bucket = await self.get_db().rate_limits.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"refilled": refilled}},
+                {"$set": {
+                    "allowed": {"$gte": ["$refilled", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$refilled", 1]}, {"$subtract": ["$refilled", 1]}, "$refilled"]},
+                    "at": now,
+                    # Idle buckets are cleaned up by the TTL index on expiresAt
+                    "expiresAt": {"$add": [now, int(burst / rate * 1000) + 60000]}
+                }},
+                {"$unset": "refilled"}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if bucket["allowed"]:
+            return 0.0
+        return (1 - bucket["tokens"]) / rate
+
+
+def create_store(get_db):
+    if RATE_LIMIT_BACKEND == "mongo":
+        return MongoTokenBuckets(get_db)
+    return InMemoryTokenBuckets()
+
+
+def _client_ip(scope) -> str:
+    if RATE_LIMIT_TRUST_PROXY:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware - allowed requests pay one dict lookup and a bit
+    of arithmetic; rejected ones never reach routing or the database.
+    """
+
+    def __init__(self, app, store, limits: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.app = app
+        self.store = store
+        limits = limits if limits is not None else parse_limits(RATE_LIMITS)
+        # Longest prefix first
+        self.limits = sorted(limits.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def _match(self, path: str):
+        for prefix, limit in self.limits:
+            if path == prefix or path.startswith(prefix + "/"):
+                return prefix, limit
+        return None, None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+
+        prefix, limit = self._match(scope["path"])
+        if prefix is None:
+            return await self.app(scope, receive, send)
+
+        retry_after = await self.store.take(f"{prefix}:{_client_ip(scope)}", *limit)
+        if not retry_after:
+            return await self.app(scope, receive, send)
+
+        body = json.dumps({"detail": "Too many requests"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, round(retry_after))).encode()),
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class KeyedLimiter:
+    """Rate limit on an application key (e.g. login email) from inside a handler"""
+
+    def __init__(self, store, name: str, spec: str):
+        self.store = store
+        self.name = name
+        self.rate, self.burst = parse_limit(spec)
+
+    async def check(self, key: str):
+        retry_after = await self.store.take(f"{self.name}:{key}", self.rate, self.burst)
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts. Please try again later.",
+                headers={"Retry-After": str(max(1, round(retry_after)))}
+            )
+
+
+# Shared by the middleware (main.py) and the login email limiter (routers/auth.py)
+rate_limit_store = create_store(database.get_db)
+login_email_limiter = KeyedLimiter(rate_limit_store, "login-email", LOGIN_EMAIL_RATE)
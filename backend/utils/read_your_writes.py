@@ -0,0 +1,60 @@
+from typing import Optional
+from bson.timestamp import Timestamp
+from fastapi import Request
+
+import database
+
+# ────────────────────────────────────────────────
+# Read-your-writes across workers
+#
+# Handlers write through database.causal_write(); this middleware hands the
+# write's operationTime back in the READ_AFTER_COOKIE cookie ("<seconds>.<inc>")
+# for READ_YOUR_WRITES_SECONDS. On later requests it loads the cookie into
+# database.causal_times, so database.causal_read() reads from a replica that
+# has applied those writes. No shared state and no extra primary round trip.
+# ────────────────────────────────────────────────
+
+READ_AFTER_COOKIE = "read_after"
+
+
+def format_time(time: Timestamp) -> str:
+    return f"{time.time}.{time.inc}"
+
+
+def parse_time(value: Optional[str]) -> Optional[Timestamp]:
+    """Cookie value -> Timestamp; None if missing or malformed"""
+    if not value:
+        return None
+    try:
+        seconds, increment = (int(part) for part in value.split("."))
+        return Timestamp(seconds, increment)
+    except (TypeError, ValueError):
+        return None
+
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI middleware carrying causal write times between requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        times = {"after": parse_time(Request(scope).cookies.get(READ_AFTER_COOKIE)), "wrote": None}
+        token = database.causal_times.set(times)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and times["wrote"] is not None:
+                cookie = (
+                    f"{READ_AFTER_COOKIE}={format_time(times['wrote'])}; "
+                    f"Max-Age={max(1, round(database.READ_YOUR_WRITES_SECONDS))}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            database.causal_times.reset(token)
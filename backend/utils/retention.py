@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+import asyncio
+import os
+from utils.leases import acquire_lease
+
+# ────────────────────────────────────────────────
+# Message retention
+#
+# Messages older than MESSAGE_RETENTION_DAYS move from `messages` (hot, what
+# get_messages reads) to `messages_archive` in batches. The copy keeps the
+# original _id, so a batch interrupted between insert and delete is simply
+# retried. MESSAGE_ARCHIVE_TTL_DAYS > 0 expires archived messages as well.
+# ────────────────────────────────────────────────
+
+MESSAGE_RETENTION_DAYS = int(os.getenv("MESSAGE_RETENTION_DAYS", "180"))
+MESSAGE_ARCHIVE_TTL_DAYS = int(os.getenv("MESSAGE_ARCHIVE_TTL_DAYS", "0"))
+MESSAGE_ARCHIVE_INTERVAL = float(os.getenv("MESSAGE_ARCHIVE_INTERVAL", "3600"))
+MESSAGE_ARCHIVE_BATCH_SIZE = int(os.getenv("MESSAGE_ARCHIVE_BATCH_SIZE", "1000"))
+MESSAGE_ARCHIVE_THROTTLE_SECONDS = float(os.getenv("MESSAGE_ARCHIVE_THROTTLE_SECONDS", "0.1"))
+
+
+async def archive_old_messages(db, retention_days: int = MESSAGE_RETENTION_DAYS) -> int:
+    """Move expired messages to the archive; returns how many moved"""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    moved = 0
+    while True:
+        batch = await db.messages.find(
+            {"createdAt": {"$lt": cutoff}}
+        ).sort("createdAt", 1).limit(MESSAGE_ARCHIVE_BATCH_SIZE).to_list(MESSAGE_ARCHIVE_BATCH_SIZE)
+        if not batch:
+            break
+
+        try:
+            await db.messages_archive.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Duplicates are left over from an interrupted batch - anything else is real
+            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+        result = await db.messages.delete_many({"_id": {"$in": [m["_id"] for m in batch]}})
+        moved += result.deleted_count
+        await asyncio.sleep(MESSAGE_ARCHIVE_THROTTLE_SECONDS)
+
+    # Closed conversation buckets past retention; their messages are in the archive
+    await db.message_buckets.delete_many({"open": False, "maxId": {"$lt": ObjectId.from_datetime(cutoff)}})
+    return moved
+
+
+async def run_archiver(get_db, interval: float = MESSAGE_ARCHIVE_INTERVAL):
+    """Background loop started from main.startup_event; disabled when retention is 0"""
+    if MESSAGE_RETENTION_DAYS <= 0:
+        return
+    while True:
+        try:
+            db = get_db()
+            if await acquire_lease(db, "message_archiver", interval):
+                moved = await archive_old_messages(db)
+                if moved:
+                    print(f"📦 Archived {moved} messages older than {MESSAGE_RETENTION_DAYS} days")
+        except Exception as e:
+            print(f"❌ Message archiving failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,113 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError, OperationFailure
+import os
+
+from utils.bson_compat import id_str
+
+# ────────────────────────────────────────────────
+# Contractor reviews and ratings
+#
+# reviews  {projectId, clientId, contractorId, rating, comment, createdAt},
+#          one per project
+#
+# Each review updates its contractor in the same transaction:
+# ratingSum/ratingCount grow by one review, and `rating` - what browse
+# sorts on - is recomputed from them in the same update as the Bayesian
+# average (PRIOR_WEIGHT * PRIOR_MEAN + sum) / (PRIOR_WEIGHT + count). A
+# contractor with few reviews stays near the prior instead of jumping to
+# 5.0 on their first one, and unreviewed contractors start at the prior
+# mean rather than 0.
+#
+# The transaction needs a replica set (or mongos). On a standalone dev
+# server the two writes run one after the other instead; the unique
+# projectId index still stops double reviews.
+# ────────────────────────────────────────────────
+
+RATING_PRIOR_MEAN = float(os.getenv("RATING_PRIOR_MEAN", "3.5"))
+RATING_PRIOR_WEIGHT = float(os.getenv("RATING_PRIOR_WEIGHT", "5"))
+
+# "Transaction numbers are only allowed on a replica set member or mongos"
+TRANSACTIONS_UNSUPPORTED_CODE = 20
+
+
+class ReviewExists(Exception):
+    pass
+
+
+def _rating_update(stars: int) -> list:
+    return [
+        {"$set": {
+            "ratingSum": {"$add": [{"$ifNull": ["$ratingSum", 0]}, stars]},
+            "ratingCount": {"$add": [{"$ifNull": ["$ratingCount", 0]}, 1]},
+            "updatedAt": "$$NOW"
+        }},
+        {"$set": {
+            "rating": {"$round": [
+                {"$divide": [
+                    {"$add": [RATING_PRIOR_WEIGHT * RATING_PRIOR_MEAN, "$ratingSum"]},
+                    {"$add": [RATING_PRIOR_WEIGHT, "$ratingCount"]}
+                ]},
+                2
+            ]}
+        }}
+    ]
+
+
+async def add_review(session, db, project: dict, contractor_id: str, stars: int, comment: str) -> dict:
+    """
+    Insert a review and fold it into the contractor's rating atomically, in a
+    transaction on `session`; raises ReviewExists
+    """
+    review = {
+        "projectId": str(project["_id"]),
+        "clientId": id_str(project["clientId"]),
+        "contractorId": id_str(contractor_id),
+        "rating": stars,
+        "comment": comment,
+        "createdAt": datetime.utcnow()
+    }
+
+    async def write(session):
+        await db.reviews.insert_one(review, session=session)
+        await db.users.update_one(
+            {"_id": ObjectId(contractor_id)}, _rating_update(stars), session=session
+        )
+
+    try:
+        try:
+            await session.with_transaction(write)
+        except OperationFailure as e:
+            if e.code != TRANSACTIONS_UNSUPPORTED_CODE:
+                raise
+            await write(session)
+    except DuplicateKeyError:
+        raise ReviewExists()
+    return review
+
+
+async def backfill_unreviewed_ratings(db) -> int:
+    """Give contractors with no reviews and no rating the prior mean; returns the count"""
+    result = await db.users.update_many(
+        {"role": "contractor", "ratingCount": {"$in": [None, 0]}, "rating": {"$in": [None, 0]}},
+        {"$set": {"rating": RATING_PRIOR_MEAN, "updatedAt": datetime.utcnow()}}
+    )
+    return result.modified_count
+
+
+async def record_completed_project(db, contractor_id):
+    await db.users.update_one(
+        {"_id": ObjectId(contractor_id)},
+        {"$inc": {"completedProjects": 1}, "$set": {"updatedAt": datetime.utcnow()}}
+    )
+
+
+def review_summary(review: dict) -> dict:
+    return {
+        "id": str(review["_id"]),
+        "project_id": review["projectId"],
+        "contractor_id": review["contractorId"],
+        "rating": review["rating"],
+        "comment": review["comment"],
+        "created_at": review["createdAt"].isoformat()
+    }
@@ -0,0 +1,59 @@
+from typing import List, Optional
+
+# ────────────────────────────────────────────────
+# Project full-text search
+#
+# Backed by a compound text index with status as an equality prefix, so
+# each search only walks the postings for one status (usually "open").
+# Relevance is Mongo's textScore, with title matches weighted highest.
+# ────────────────────────────────────────────────
+
+PROJECT_TEXT_INDEX = [("status", 1), ("title", "text"), ("description", "text"), ("skillsRequired", "text")]
+PROJECT_TEXT_WEIGHTS = {"title": 10, "skillsRequired": 5, "description": 2}
+PROJECT_TEXT_INDEX_NAME = "project_text_search"
+
+
+async def ensure_text_index(db):
+    await db.projects.create_index(
+        PROJECT_TEXT_INDEX,
+        weights=PROJECT_TEXT_WEIGHTS,
+        name=PROJECT_TEXT_INDEX_NAME,
+        default_language="english"
+    )
+
+
+def build_search_query(
+    q: Optional[str],
+    status: str = "open",
+    skills: Optional[List[str]] = None,
+    min_budget: Optional[float] = None,
+    max_budget: Optional[float] = None
+) -> dict:
+    query = {"status": status}
+    if q:
+        query["$text"] = {"$search": q}
+    if skills:
+        query["skillsRequired"] = {"$in": skills}
+    if min_budget is not None or max_budget is not None:
+        query["budget"] = {}
+        if min_budget is not None:
+            query["budget"]["$gte"] = min_budget
+        if max_budget is not None:
+            query["budget"]["$lte"] = max_budget
+    return query
+
+
+async def search_projects(db, query: dict, limit: int = 20, offset: int = 0) -> List[dict]:
+    """Matching projects, most relevant first"""
+    return await db.projects.find(
+        query,
+        {
+            "title": 1,
+            "description": 1,
+            "budget": 1,
+            "skillsRequired": 1,
+            "status": 1,
+            "postedDate": 1,
+            "score": {"$meta": "textScore"}
+        }
+    ).sort([("score", {"$meta": "textScore"})]).skip(offset).limit(limit).to_list(limit)
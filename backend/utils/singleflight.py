@@ -0,0 +1,85 @@
+from fastapi import Request, Response
+from typing import Callable, List, Optional
+import asyncio
+import functools
+
+from utils.cache import TTLCache
+from utils.invalidation import invalidation_bus
+
+
+def call_key(kwargs: dict) -> tuple:
+    """Hashable key for a handler call - its resolved arguments minus Request/Response"""
+    return tuple(sorted(
+        (name, repr(value)) for name, value in kwargs.items()
+        if not isinstance(value, (Request, Response))
+    ))
+
+
+def forget_calls(cache: TTLCache, collections: List[str], scope: Optional[Callable[[dict], Optional[dict]]] = None):
+    """
+    Drop a call-keyed cache's entries when these collections change on any
+    worker (utils/invalidation.py). scope(event) returns the arguments whose
+    calls are affected - {"client_id": ...} for one client's calls, {} for
+    every call - or None when the change doesn't matter.
+    """
+    def forget(event: dict):
+        if event["type"] == "reset":
+            cache.clear()
+            return
+        arguments = scope(event) if scope else {}
+        if arguments is None:
+            return
+        wanted = {(name, repr(value)) for name, value in arguments.items()}
+        cache.invalidate_where(lambda key, value: wanted.issubset(key))
+
+    invalidation_bus.subscribe(collections, forget)
+
+
+def single_flight(ttl: float = 0, invalidate_on: Optional[List[str]] = None,
+                  scope: Optional[Callable[[dict], Optional[dict]]] = None):
+    """
+    Route decorator coalescing identical concurrent calls.
+
+    Calls are identical when they hit the same handler with the same
+    arguments - the auth subject (e.g. client_id) and query parameters
+    FastAPI resolved for it. The first caller runs the handler; the rest
+    await its result (or exception). With ttl > 0 the result is also reused
+    for that many seconds after it completes, unless a change to one of the
+    invalidate_on collections drops it first (see forget_calls for scope).
+
+    Usage - place below the @router decorator:
+        @router.get("/contractors")
+        @single_flight(ttl=2)
+        async def browse_contractors(...):
+    """
+    def decorator(func):
+        in_flight = {}
+        recent = TTLCache(ttl=ttl, max_entries=5000) if ttl > 0 else None
+        if recent is not None and invalidate_on:
+            forget_calls(recent, invalidate_on, scope)
+
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            key = call_key(kwargs)
+            if recent is not None:
+                cached = recent.get(key)
+                if cached is not None:
+                    return cached
+
+            task = in_flight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(func(**kwargs))
+                in_flight[key] = task
+
+                def finished(t, key=key):
+                    in_flight.pop(key, None)
+                    if recent is not None and not t.cancelled() and t.exception() is None:
+                        recent.set(key, t.result())
+
+                task.add_done_callback(finished)
+
+            # One caller disconnecting must not cancel the shared work
+            return await asyncio.shield(task)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,110 @@
+import codecs
+import json
+from typing import AsyncIterator, Tuple
+
+# Largest single item we will buffer while waiting for it to complete
+MAX_ITEM_BYTES = 1024 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+class StreamFormatError(ValueError):
+    """The upload is not a JSON array / NDJSON stream we can continue reading"""
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """Yield (row, item) for each line; unparseable lines yield (row, JSONDecodeError)"""
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    row = 0
+    async for chunk in chunks:
+        buffer += utf8.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        if len(buffer) > MAX_ITEM_BYTES:
+            raise StreamFormatError(f"Line {row + len(lines) + 1} exceeds {MAX_ITEM_BYTES} bytes")
+        for line in lines:
+            if not line.strip():
+                continue
+            row += 1
+            try:
+                yield row, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield row, e
+    buffer += utf8.decode(b"", final=True)
+    if buffer.strip():
+        row += 1
+        try:
+            yield row, json.loads(buffer)
+        except json.JSONDecodeError as e:
+            yield row, e
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Yield (row, item) for each element of a top-level JSON array without
+    holding the whole document in memory. Elements must be objects or arrays
+    so a partially received element can never parse as complete.
+    """
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    row = 0
+    state = "start"  # start -> item -> separator -> ... -> end
+
+    async def more() -> bool:
+        nonlocal buffer, pos
+        async for chunk in chunk_iter:
+            buffer = buffer[pos:] + utf8.decode(chunk)
+            pos = 0
+            return True
+        return False
+
+    chunk_iter = chunks.__aiter__()
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        if pos >= len(buffer):
+            if not await more():
+                break
+            continue
+
+        char = buffer[pos]
+        if state == "start":
+            if char != "[":
+                raise StreamFormatError("Expected a JSON array")
+            pos += 1
+            state = "item"
+        elif state == "separator":
+            if char == ",":
+                pos += 1
+                state = "item"
+            elif char == "]":
+                pos += 1
+                state = "end"
+            else:
+                raise StreamFormatError(f"Expected ',' or ']' after row {row}")
+        elif state == "item":
+            if char == "]" and row == 0:
+                pos += 1
+                state = "end"
+                continue
+            if char not in "{[":
+                raise StreamFormatError(f"Row {row + 1} is not a JSON object")
+            try:
+                item, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if len(buffer) - pos > MAX_ITEM_BYTES:
+                    raise StreamFormatError(f"Row {row + 1} exceeds {MAX_ITEM_BYTES} bytes or is malformed")
+                if not await more():
+                    raise StreamFormatError(f"Row {row + 1} is truncated or malformed")
+                continue
+            row += 1
+            pos = end
+            state = "separator"
+            yield row, item
+        else:
+            raise StreamFormatError("Unexpected data after the closing ']'")
+
+    if state != "end":
+        raise StreamFormatError("Upload ended before the closing ']'")